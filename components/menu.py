@@ -1,9 +1,14 @@
+from dataclasses import replace
+from functools import partial
+from typing import Callable
+
 from rich.text import Text
 from textual.app import App
 from textual.widgets import Tree
 from textual.widgets._tree import TreeNode
 
 from connection.connection import Connection
+from util.model import NodeData, NodeKind
 import util.util as U
 
 class Menu(App):
@@ -15,261 +20,357 @@ class Menu(App):
     TABLES = "[T]"
     VIEWS = "[V]"
     SEQUENCES = "[SQ]"
-    tree: Tree[str] = []
-    id_map = dict()
+    LOADING = "loading…"
+    tree: Tree[NodeData] = []
 
     def __init__(self, connections: [Connection]) -> None:
         super().__init__()
         self.connections = connections
+        self.index: dict[str, Connection] = dict()
+        self.connection_nodes: dict[str, TreeNode] = dict()
         self.set_tree(Tree("Connections"))
         self.tree.root.expand()
         self.render(connections)
 
     def render(self, connections: [Connection]) -> None:
         for connection in connections:
-            txt: Text = Text()
-            txt.append(
-                f"[{connection.conn.env.name.upper()}] ",
-                style=f"bold {U.get_env_color(connection.conn.env)}",
-            )
-            txt.append(connection.conn.id)
-            self.tree.root.add(txt)
-            self.id_map[txt.plain] = connection.id
+            self.add_connection_node(connection)
 
-    def set_tree(self, tree: Tree[str]):
+    def set_tree(self, tree: Tree[NodeData]):
         self.tree = tree
 
-    def fill_child_nodes(self, event: Tree.NodeExpanded) -> Connection:
-        if len(event.node.children) == 0:
-            label: str = event.node.label.plain
-            if label.startswith("["):
-                parent_label = event.node.parent.label.plain
-                conn: Connection = self.get_connection_by_node(event.node)
-                prefix = label.split(" ")[0]
-                match prefix:
-                    case self.SCHEMA:
-                        event.node.add(
-                            Text().append("[T] ", style="turquoise2").append("Tables")
-                        )
-                        event.node.add(
-                            Text().append("[V] ", style="turquoise2").append("Views")
-                        )
-                        event.node.add(
-                            Text()
-                            .append("[Sq] ", style="turquoise2")
-                            .append("Sequences", style="s")
-                        )
-                    case self.TABLE | self.VIEW | self.TABLES | self.VIEWS:
-                        match prefix:
-                            case self.TABLE | self.TABLES:
-                                type = "table"
-                                prefix = self.TABLE
-                            case self.VIEW | self.VIEWS:
-                                type = "view"
-                                prefix = self.VIEW
-                        if parent_label[:3] == self.SCHEMA:
-                            match type:
-                                case "table":
-                                    objects = conn.tables(
-                                        self.strip_decorator(parent_label)
-                                    )
-                                case "view":
-                                    objects = conn.views(
-                                        self.strip_decorator(parent_label)
-                                    )
-                            for table_name in objects:
-                                event.node.add(
-                                    Text()
-                                    .append(f"{prefix} ", style="turquoise2")
-                                    .append(table_name)
-                                )
-                        else:
-                            for column_def in conn.columns(
-                                self.strip_decorator(
-                                    event.node.parent.parent.label.plain
-                                ),
-                                self.strip_decorator(label),
-                                type,
-                            ):
-                                txt: Text = (
-                                    Text()
-                                    .append(f"{self.COLUMN} ", style="turquoise2")
-                                    .append(column_def[0])
-                                )
-                                if column_def[2]:
-                                    txt.append(" ").append("NULL", style="red s")
-                                if column_def[3]:
-                                    txt.append(" ").append("PK", style="red")
-                                column = event.node.add(txt)
-                                column.add_leaf(column_def[1])
-
-                                if column_def[2]:
-                                    column.add_leaf(
-                                        Text().append("NOT NULL", style="yellow1")
-                                    )
-                                if column_def[3]:
-                                    column.add_leaf(
-                                        Text().append("PRIMARY KEY", style="yellow1")
-                                    )
-                    case _:
-                        if event.node.parent is not None and event.node.parent.is_root:
-                            conn: Connection = self.get_connection_by_node(event.node)
-                            for schema_name in conn.schemas():
-                                txt: Text = (
-                                    Text()
-                                    .append(f"{self.SCHEMA} ", style="turquoise2")
-                                    .append(schema_name)
-                                )
-                                event.node.add(txt)
-                return Connection
+    def fill_child_nodes(
+        self, event: Tree.NodeExpanded
+    ) -> tuple[Callable[[], list], Callable[[list], None]] | None:
+        """
+        Adds the static children of the expanded node, or a loading placeholder.
+        For the latter returns (load, fill): `load` queries the catalog and is blocking,
+        `fill` adds its result to the node on the UI thread.
+        """
+        node: TreeNode = event.node
+        data: NodeData = node.data
+        if len(node.children) != 0 or data is None:
             return None
+        conn: Connection = self.get_connection_by_node(node)
+        match data.kind:
+            case NodeKind.SCHEMA:
+                node.add(
+                    Text().append("[T] ", style="turquoise2").append("Tables"),
+                    data=replace(data, kind=NodeKind.TABLES, type="table"),
+                )
+                node.add(
+                    Text().append("[V] ", style="turquoise2").append("Views"),
+                    data=replace(data, kind=NodeKind.VIEWS, type="view"),
+                )
+                node.add(
+                    Text()
+                    .append("[Sq] ", style="turquoise2")
+                    .append("Sequences", style="s"),
+                    data=replace(data, kind=NodeKind.SEQUENCES),
+                )
+                return None
+            case _:
+                work = self.loader(node)
+                if work is None:
+                    return None
+                load, specs = work
+        placeholder: TreeNode = node.add_leaf(
+            Text(self.LOADING, style="dim italic"),
+            data=replace(data, kind=NodeKind.LOADING),
+        )
+        return (load, partial(self.fill_loaded, node, placeholder, specs))
 
-    def get_connection_by_id(self, id: str) -> Connection:
-        for connection in self.connections:
-            if connection.id == self.id_map[id]:
-                return connection
+    def loader(
+        self, node: TreeNode
+    ) -> tuple[Callable[[], list], Callable[[TreeNode, list], list[tuple]]] | None:
+        """
+        (load, specs) for a node whose children come from the catalog: `load` is blocking,
+        `specs` turns its result into (data, label, leaves) child specs.
+        """
+        data: NodeData = node.data
+        conn: Connection = self.get_connection_by_node(node)
+        match data.kind:
+            case NodeKind.TABLES | NodeKind.VIEWS:
+                return (
+                    partial(
+                        conn.tables if data.type == "table" else conn.views, data.schema
+                    ),
+                    self.object_specs,
+                )
+            case NodeKind.TABLE | NodeKind.VIEW:
+                return (
+                    partial(conn.columns, data.schema, data.object, data.type),
+                    self.column_specs,
+                )
+            case NodeKind.CONNECTION:
+                return (conn.schemas, self.schema_specs)
+        return None
 
-    def get_connection_by_node(self, node: TreeNode) -> Connection:
-        base_name: str = self.get_base_node(node).label.plain
-        return self.get_connection_by_id(base_name)
+    def fill_loaded(
+        self,
+        node: TreeNode,
+        placeholder: TreeNode,
+        specs: Callable[[TreeNode, list], list[tuple]],
+        items: list,
+    ) -> None:
+        if placeholder not in node.children:
+            # collapsed or refreshed while loading
+            return
+        placeholder.remove()
+        for spec in specs(node, items):
+            self.add_child(node, *spec)
 
-    def get_base_node(self, node: TreeNode) -> TreeNode:
-        parent_node: TreeNode = node.parent
-        if parent_node.is_root:
-            return node
-        else:
-            return self.get_base_node(parent_node)
+    def add_child(
+        self,
+        node: TreeNode,
+        data: NodeData,
+        label: Text,
+        leaves: list[Text] | None,
+        before: int = None,
+    ) -> TreeNode:
+        child: TreeNode = node.add(label, data=data, before=before)
+        for leaf in leaves or []:
+            child.add_leaf(leaf, data=replace(data, kind=NodeKind.DETAIL))
+        return child
 
-    def get_parent_node_by_type(self, node: TreeNode, node_type: [str]) -> TreeNode:
-        if node.is_root:
-            return None
-        else:
-            if node.label.plain.split(" ")[0] in node_type:
-                return node
+    def patch_children(self, node: TreeNode, specs: list[tuple]) -> None:
+        """
+        Brings the children of `node` in line with `specs`. Unchanged children keep their
+        node, and with it their expansion state and subtree.
+        """
+        wanted: dict[NodeData, tuple] = {spec[0]: spec for spec in specs}
+        kept: dict[NodeData, TreeNode] = dict()
+        for child in list(node.children):
+            if child.data in wanted and child.data not in kept:
+                kept[child.data] = child
             else:
-                return self.get_parent_node_by_type(node.parent, node_type)
+                child.remove()
+        for position, (data, label, leaves) in enumerate(specs):
+            child = kept.get(data)
+            if child is None:
+                before = position if position < len(node.children) else None
+                self.add_child(node, data, label, leaves, before)
+            elif leaves is not None and (
+                child.label.plain != label.plain
+                or [leaf.label.plain for leaf in child.children]
+                != [leaf.plain for leaf in leaves]
+            ):
+                child.set_label(label)
+                child.remove_children()
+                for leaf in leaves:
+                    child.add_leaf(leaf, data=replace(data, kind=NodeKind.DETAIL))
+
+    def reloadable(self, node: TreeNode) -> bool:
+        return node.data is not None and node.data.kind in [
+            NodeKind.CONNECTION,
+            NodeKind.SCHEMA,
+            NodeKind.TABLES,
+            NodeKind.VIEWS,
+            NodeKind.TABLE,
+            NodeKind.VIEW,
+        ]
+
+    def is_loading(self, node: TreeNode) -> bool:
+        return (
+            len(node.children) == 1
+            and node.children[0].data is not None
+            and node.children[0].data.kind == NodeKind.LOADING
+        )
+
+    def schema_specs(self, node: TreeNode, schemas: list[str]) -> list[tuple]:
+        return [
+            (
+                NodeData(NodeKind.SCHEMA, node.data.uid, schema_name),
+                Text().append(f"{self.SCHEMA} ", style="turquoise2").append(schema_name),
+                None,
+            )
+            for schema_name in schemas
+        ]
 
-    def get_schema_node(self, node: TreeNode) -> TreeNode:
-        if node.is_root:
+    def object_specs(self, node: TreeNode, objects: list[str]) -> list[tuple]:
+        data: NodeData = node.data
+        prefix, kind = (
+            (self.TABLE, NodeKind.TABLE)
+            if data.type == "table"
+            else (self.VIEW, NodeKind.VIEW)
+        )
+        return [
+            (
+                replace(data, kind=kind, object=table_name),
+                Text().append(f"{prefix} ", style="turquoise2").append(table_name),
+                None,
+            )
+            for table_name in objects
+        ]
+
+    def column_specs(
+        self, node: TreeNode, columns: list[(str, str, bool, bool, str)]
+    ) -> list[tuple]:
+        specs: list[tuple] = []
+        for column_def in columns:
+            txt: Text = (
+                Text().append(f"{self.COLUMN} ", style="turquoise2").append(column_def[0])
+            )
+            if column_def[2]:
+                txt.append(" ").append("NULL", style="red s")
+            if column_def[3]:
+                txt.append(" ").append("PK", style="red")
+            leaves: list[Text] = [Text(str(column_def[1]))]
+            if column_def[2]:
+                leaves.append(Text().append("NOT NULL", style="yellow1"))
+            if column_def[3]:
+                leaves.append(Text().append("PRIMARY KEY", style="yellow1"))
+            specs.append(
+                (
+                    replace(node.data, kind=NodeKind.COLUMN, column=column_def[0]),
+                    txt,
+                    leaves,
+                )
+            )
+        return specs
+
+    def prefetch_targets(self, node: TreeNode, visible: int) -> tuple | None:
+        """
+        Arguments for `Connection.prefetch` after `node` was expanded, or None.
+        """
+        data: NodeData = node.data
+        if data is None:
             return None
-        else:
-            if node.label.plain.split(" ")[0] == self.SCHEMA:
-                return node
-            else:
-                return self.get_schema_node(node.parent)
+        match data.kind:
+            case NodeKind.SCHEMA:
+                return (data.schema,)
+            case NodeKind.TABLES | NodeKind.VIEWS:
+                return (
+                    data.schema,
+                    data.type,
+                    [child.data.object for child in node.children[:visible]],
+                )
+        return None
 
-    def strip_decorator(self, name: str) -> str:
-        if name is None or not name.startswith("["):
-            return name
-        return name.split(" ")[1]
+    def node_path(
+        self, uid: str, schema: str, type: str, object: str, column: str
+    ) -> list[NodeData]:
+        """
+        Data of the nodes leading from the connection node down to the given object.
+        """
+        path: list[NodeData] = [NodeData(NodeKind.CONNECTION, uid)]
+        if schema is not None:
+            path.append(NodeData(NodeKind.SCHEMA, uid, schema))
+        if type is not None:
+            folder = NodeKind.TABLES if type == "table" else NodeKind.VIEWS
+            path.append(NodeData(folder, uid, schema, type))
+        if object is not None:
+            kind = NodeKind.TABLE if type == "table" else NodeKind.VIEW
+            path.append(NodeData(kind, uid, schema, type, object))
+        if column is not None:
+            path.append(NodeData(NodeKind.COLUMN, uid, schema, type, object, column))
+        return path
 
-    def get_refresh_type(self, node: TreeNode) -> (str, str, str):
-        schema_node: TreeNode = self.get_schema_node(node)
-        if not schema_node:
+    def get_connection_by_id(self, uid: str) -> Connection | None:
+        return self.index.get(uid)
+
+    def get_connection_by_node(self, node: TreeNode) -> Connection | None:
+        if node.data is None:
             return None
+        return self.index.get(node.data.uid)
 
-        schema: str = schema_node.label.plain
-        type: str = None
-        obj: str = None
-        active_type = node.label.plain.split(" ")
-        parent_type = node.parent.label.plain.split(" ")
-        if len(active_type) == 1 or len(parent_type) == 1:
+    def get_base_node(self, node: TreeNode) -> TreeNode | None:
+        if node.data is None:
             return None
-        else:
-            if active_type[0] == parent_type[0]:
-                match active_type[0]:
-                    case self.TABLE:
-                        type = "tables"
-                    case self.VIEW:
-                        type = "views"
-            else:
-                match parent_type[0]:
-                    case self.SCHEMA:
-                        type = "schema"
-                    case self.TABLE:
-                        type = "table"
-                        obj = node.parent.label.plain
-                    case self.VIEW:
-                        type = "view"
-                        obj = node.parent.label.plain
-                    case self.COLUMN:
-                        parent = self.get_refresh_type(node.parent)
-                        type = parent[0]
-                        obj = parent[2]
-                    case _:
-                        return None
-        return (type, self.strip_decorator(schema), self.strip_decorator(obj))
+        return self.connection_nodes.get(node.data.uid)
 
-    def refresh_connection(self) -> None:
+    def get_refresh_type(self, node: TreeNode) -> (str, str, str):
+        """
+        The metadata level holding `node`, as (type, schema, object) for `clear_by_type`.
+        """
+        data: NodeData = node.data
+        if data is None:
+            return None
+        match data.kind:
+            case NodeKind.TABLES | NodeKind.VIEWS | NodeKind.SEQUENCES:
+                return ("schema", data.schema, None)
+            case NodeKind.TABLE | NodeKind.VIEW:
+                return (f"{data.type}s", data.schema, None)
+            case NodeKind.COLUMN | NodeKind.DETAIL:
+                return (data.type, data.schema, data.object)
+        return None
+
+    def refresh_connection(self) -> TreeNode | None:
+        """
+        Clears the metadata of the connection under the cursor and returns its node to reload.
+        """
         tree: Tree = self.app.query_one(Tree)
         active_node: TreeNode = tree.cursor_node
         if active_node is None or active_node.is_root:
-            return
+            return None
         self.get_connection_by_node(active_node).clear()
-        base_node: TreeNode = self.get_base_node(active_node)
-        base_node.remove_children()
-        base_node.collapse()
-        tree.select_node(base_node)
+        return self.get_base_node(active_node)
 
-    def refresh_parent(self) -> None:
+    def refresh_parent(self) -> TreeNode | None:
+        """
+        Clears the metadata level holding the cursor node and returns the node to reload.
+        """
         tree: Tree = self.app.query_one(Tree)
         active_node: TreeNode = tree.cursor_node
         if active_node is None or active_node.is_root:
-            return
+            return None
         refresh_data = self.get_refresh_type(active_node)
-        if refresh_data:
-            self.get_connection_by_node(active_node).clear_by_type(
-                refresh_data[0], refresh_data[1], refresh_data[2]
-            )
-            base_node = active_node.parent
-            base_node.remove_children()
-            base_node.collapse()
-            tree.select_node(base_node)
-        else:
-            self.refresh_connection()
+        if refresh_data is None:
+            return self.refresh_connection()
+        self.get_connection_by_node(active_node).clear_by_type(
+            refresh_data[0], refresh_data[1], refresh_data[2]
+        )
+        base_node: TreeNode = active_node.parent
+        if active_node.data.kind == NodeKind.DETAIL:
+            base_node = base_node.parent
+        return base_node
 
-    def preview_data(self) -> None:
+    def preview_data(self) -> Connection | None:
         tree: Tree = self.app.query_one(Tree)
         active_node: TreeNode = tree.cursor_node
-        table_node: TreeNode = self.get_parent_node_by_type(
-            active_node, [self.TABLE, self.VIEW]
-        )
-        if table_node:
-            table_name = self.strip_decorator(table_node.label.plain)
-            schema_name = self.strip_decorator(
-                self.get_schema_node(table_node).label.plain
-            )
-            self.get_connection_by_node(table_node).exec_preview(
-                schema_name, table_name
-            )
+        data: NodeData = active_node.data
+        if data is not None and data.object is not None:
+            connection: Connection = self.get_connection_by_node(active_node)
+            connection.load_preview(data.schema, data.object)
+            return connection
+        return None
 
-    def add_connection_node(self, connection: Connection):
+    def connection_label(self, connection: Connection) -> Text:
         txt: Text = Text()
         txt.append(
             f"[{connection.conn.env.name.upper()}] ",
             style=f"bold {U.get_env_color(connection.conn.env)}",
         )
         txt.append(connection.conn.id)
-        self.id_map[txt.plain] = connection.id
-        self.tree.root.add(txt)
+        return txt
+
+    def add_connection_node(self, connection: Connection):
+        self.index[connection.id] = connection
+        self.connection_nodes[connection.id] = self.tree.root.add(
+            self.connection_label(connection),
+            data=NodeData(NodeKind.CONNECTION, connection.id),
+        )
+
+    def update_connection_node(self, connection: Connection) -> None:
+        """
+        Relabels the node of an edited connection and drops its now stale subtree.
+        """
+        node: TreeNode = self.connection_nodes[connection.id]
+        node.set_label(self.connection_label(connection))
+        node.remove_children()
+        node.collapse()
 
     def get_selected_connection(self) -> Connection | None:
         tree: Tree = self.app.query_one(Tree)
         if tree.cursor_node.is_root:
             return None
-        base_node: TreeNode = self.get_base_node(tree.cursor_node)
-        return self.get_connection_by_node(base_node)
+        return self.get_connection_by_node(tree.cursor_node)
 
     def remove_node(self):
         tree: Tree = self.app.query_one(Tree)
         if tree.cursor_node.is_root:
             return None
         base_node: TreeNode = self.get_base_node(tree.cursor_node)
+        del self.index[base_node.data.uid]
+        del self.connection_nodes[base_node.data.uid]
         base_node.remove()
-
-    def refresh_tree(self, connections: [Connection]) -> None:
-        tree: Tree = self.app.query_one(Tree)
-        tree.root.remove_children()
-        self.connections = connections
-        # self.refresh()
-        self.render(connections)
@@ -0,0 +1,259 @@
+from collections import OrderedDict
+
+from rich.cells import cell_len, set_cell_size
+from rich.segment import Segment
+from rich.style import Style
+from textual.geometry import Size
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+
+from connection.pager import ResultPager
+
+
+class ResultsView(ScrollView, can_focus=True):
+    """
+    Virtual results grid, materializing only the pages around the visible window
+    """
+
+    DEFAULT_CSS = """
+    ResultsView {
+        width: 100%;
+        height: 100%;
+    }
+    """
+
+    MAX_COLUMN_WIDTH = 40
+    MAX_PAGES = 20
+    SEPARATOR = " │ "
+    HEADER_STYLE = Style(bold=True, underline=True)
+    NULL_STYLE = Style(dim=True, italic=True)
+    SEPARATOR_STYLE = Style(dim=True)
+    STATUS_STYLE = Style(dim=True)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.reset((), None)
+
+    def reset(self, columns: tuple, pager: ResultPager | None) -> None:
+        self.columns: tuple = columns
+        self.widths: list[int] = [cell_len(str(name)) for name in columns]
+        self.pages: OrderedDict[int, list[tuple]] = OrderedDict()
+        self.requested: set[int] = set()
+        self.pager: ResultPager | None = pager
+        self.page_size: int = ResultPager.PAGE_SIZE if pager is None else pager.page_size
+        self.row_count: int = 0
+        self.total: int | None = None
+        self.estimate: int | None = None
+        self.follow = False
+        if self.is_mounted:
+            self.scroll_to(0, 0, animate=False, immediate=True)
+
+    def clear(self) -> None:
+        self.reset((), None)
+        self.update_size()
+
+    def show(self, columns: tuple, rows: list[tuple]) -> None:
+        """
+        Shows a fully materialized result, such as a status message.
+        """
+        self.reset(columns, None)
+        self.page_size = max(len(rows), 1)
+        self.pages[0] = rows
+        self.row_count = self.total = len(rows)
+        self.measure(rows)
+        self.update_size()
+
+    def attach(
+        self, columns: tuple, pager: ResultPager, rows: list[tuple], estimate: int | None
+    ) -> None:
+        """
+        Shows the first page of an open result and pulls further pages on demand.
+        """
+        self.reset(columns, pager)
+        self.estimate = estimate
+        self.add_page(pager, 0, rows)
+
+    def add_page(self, pager: ResultPager, page: int, rows: list[tuple]) -> None:
+        if pager is not self.pager or pager.closed:
+            return
+        self.requested.discard(page)
+        self.pages[page] = rows
+        self.pages.move_to_end(page)
+        self.measure(rows)
+        self.row_count = pager.rows
+        self.total = pager.total
+        self.evict()
+        self.update_size()
+        if self.complete():
+            # every row is on hand, so the cursor and its session can go
+            pager.close()
+            return
+        self.prefetch()
+        if self.follow and (self.total is not None or pager.limited()):
+            self.follow = False
+        if self.follow:
+            self.request(self.row_count // self.page_size)
+
+    def complete(self) -> bool:
+        if self.total is None:
+            return False
+        return all(page in self.pages for page in range(-(-self.total // self.page_size)))
+
+    def measure(self, rows: list[tuple]) -> None:
+        for row in rows:
+            for idx, value in enumerate(row[: len(self.widths)]):
+                width = min(cell_len(self.format(value)), self.MAX_COLUMN_WIDTH)
+                if width > self.widths[idx]:
+                    self.widths[idx] = width
+
+    def update_size(self) -> None:
+        width = sum(self.widths) + cell_len(self.SEPARATOR) * max(len(self.widths) - 1, 0)
+        self.virtual_size = Size(width, self.row_count + 2)
+        self.refresh()
+
+    def visible_rows(self) -> (int, int):
+        first = int(self.scroll_offset.y)
+        return (first, first + max(self.size.height - 2, 1))
+
+    def prefetch(self) -> None:
+        if self.pager is None or self.pager.closed:
+            return
+        first, last = self.visible_rows()
+        wanted = range(
+            max(first // self.page_size - 1, 0), last // self.page_size + 2
+        )
+        for page in wanted:
+            self.request(page)
+
+    def request(self, page: int) -> None:
+        if page in self.requested or self.pager.closed:
+            return
+        start = page * self.page_size
+        limit = self.pager.limit
+        if limit is not None and start >= limit:
+            return
+        rows = self.pages.get(page)
+        if rows is not None:
+            complete = len(rows) == self.page_size or self.total is not None
+            if complete or (limit is not None and start + len(rows) >= limit):
+                return
+        if start < self.row_count or (self.total is None and start == self.row_count):
+            self.requested.add(page)
+            self.pager.request(page)
+
+    def extend_limit(self, rows: int | None) -> bool:
+        """
+        Raises the fetch limit of the open result by `rows`, or lifts it when None.
+        """
+        if self.pager is None or self.pager.closed or self.total is not None:
+            return False
+        if self.pager.limit is None and rows is not None:
+            return False
+        self.pager.limit = None if rows is None else self.pager.limit + rows
+        # the rows up to the new limit are wanted now, not when scrolled to
+        self.follow = True
+        self.prefetch()
+        self.request(self.row_count // self.page_size)
+        self.refresh()
+        return True
+
+    def stop(self) -> int | None:
+        """
+        Stops following or paging the open result, keeping the rows already fetched.
+        Returns how many arrived, or None when nothing was being fetched.
+        """
+        if self.pager is None or self.pager.closed:
+            return None
+        if not self.follow and len(self.requested) == 0:
+            return None
+        self.follow = False
+        self.requested.clear()
+        self.pager.close()
+        self.refresh()
+        return self.row_count
+
+    def evict(self) -> None:
+        first, last = self.visible_rows()
+        visible = range(first // self.page_size, last // self.page_size + 1)
+        for page in list(self.pages.keys()):
+            if len(self.pages) <= self.MAX_PAGES:
+                break
+            if page not in visible:
+                del self.pages[page]
+
+    def watch_scroll_y(self, old_value: float, new_value: float) -> None:
+        super().watch_scroll_y(old_value, new_value)
+        self.prefetch()
+
+    def on_resize(self) -> None:
+        self.prefetch()
+
+    def get_row(self, index: int) -> tuple | None:
+        page = index // self.page_size
+        rows = self.pages.get(page)
+        if rows is None:
+            return None
+        self.pages.move_to_end(page)
+        offset = index - page * self.page_size
+        return rows[offset] if offset < len(rows) else None
+
+    def format(self, value: any) -> str:
+        if value is None:
+            return "NULL"
+        return str(value).replace("\n", " ")
+
+    def cells(self, values: tuple, style: Style = None) -> Strip:
+        segments: list[Segment] = []
+        for idx, width in enumerate(self.widths):
+            if idx != 0:
+                segments.append(Segment(self.SEPARATOR, self.SEPARATOR_STYLE))
+            value = values[idx] if idx < len(values) else ""
+            text = self.format(value)
+            if cell_len(text) > width:
+                text = set_cell_size(text, width - 1) + "…"
+            segments.append(
+                Segment(
+                    set_cell_size(text, width),
+                    self.NULL_STYLE if value is None else style,
+                )
+            )
+        return Strip(segments)
+
+    def status(self) -> str:
+        if len(self.columns) == 0:
+            return ""
+        first, last = self.visible_rows()
+        last = min(last, self.row_count)
+        if self.total is not None:
+            count = f"{self.total:,}"
+        elif self.estimate is not None:
+            count = f"{self.row_count:,}+ (~{self.estimate:,})"
+        else:
+            count = f"{self.row_count:,}+"
+        text = f" rows {min(first + 1, last):,}-{last:,} of {count}"
+        if self.pager is not None and self.pager.closed and not self.complete():
+            text += " · idle, run again to page" if self.pager.expired else " · stopped"
+        elif self.pager is not None and self.pager.limited():
+            text += f" · limit {self.pager.limit:,} reached"
+        if len(self.requested) != 0:
+            text += " loading…"
+        return text
+
+    def render_line(self, y: int) -> Strip:
+        width = self.size.width
+        scroll_x = int(self.scroll_offset.x)
+        if y == 0:
+            strip = self.cells(self.columns, self.HEADER_STYLE)
+        elif y == self.size.height - 1:
+            return Strip([Segment(self.status(), self.STATUS_STYLE)]).adjust_cell_length(
+                width
+            )
+        else:
+            index = int(self.scroll_offset.y) + y - 1
+            if index >= self.row_count:
+                return Strip.blank(width)
+            row = self.get_row(index)
+            if row is None:
+                return Strip([Segment(" …", self.STATUS_STYLE)]).adjust_cell_length(width)
+            strip = self.cells(row)
+        return strip.crop(scroll_x, scroll_x + width).adjust_cell_length(width)
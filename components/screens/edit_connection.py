@@ -101,6 +101,7 @@ class EditConnectionScreen(ModalScreen):
                     password,
                     ConnectorType[connectionType.upper()],
                     Env[env],
+                    self.conn.options,
                 )
                 connection = Connection.from_conn(conn)
                 connection.test()
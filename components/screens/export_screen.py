@@ -0,0 +1,64 @@
+import os.path
+
+from textual.app import ComposeResult
+from textual.containers import Horizontal, Vertical
+from textual.screen import ModalScreen
+from textual.widgets import Button, Input, Label, Select
+
+from util.model import ExportFormat
+
+
+class ExportScreen(ModalScreen):
+    """Screen with a dialog to export the current query results."""
+
+    def __init__(self, name: str):
+        self.file_name = name
+        super().__init__()
+
+    def compose(self) -> ComposeResult:
+        with Vertical(classes="dialog export container"):
+            with Horizontal(classes="container w1"):
+                yield Label("Export results", id="header")
+
+            with Horizontal(classes="container w1"):
+                with Vertical(classes="w7"):
+                    yield Input(
+                        placeholder="File",
+                        id="path",
+                        value=f"{self.file_name}.{ExportFormat.CSV.value}",
+                    )
+                with Vertical(classes="w3"):
+                    yield Select(
+                        ((line, line) for line in ExportFormat.list()),
+                        allow_blank=False,
+                        id="format",
+                    )
+
+            with Horizontal(classes="container padded"):
+                with Vertical(classes="w3"):
+                    yield Button(
+                        "Export", variant="primary", id="confirm", classes="dialog_button"
+                    )
+                with Vertical(classes="w3"):
+                    yield Button(
+                        "Cancel",
+                        variant="error",
+                        id="cancel",
+                        classes="dialog_button",
+                    )
+
+    def on_select_changed(self, event: Select.Changed) -> None:
+        path: Input = self.query_one("#path")
+        root, extension = os.path.splitext(path.value)
+        if extension[1:] in ExportFormat.list():
+            path.value = f"{root}.{event.value}"
+
+    def on_button_pressed(self, event: Button.Pressed) -> None:
+        if event.button.id == "confirm":
+            path: str = self.query_one("#path").value.strip()
+            if len(path) == 0:
+                self.app.action_notify("'File' field is required", "Export", "error")
+                return
+            self.dismiss((path, ExportFormat(self.query_one("#format").value)))
+        else:
+            self.app.pop_screen()
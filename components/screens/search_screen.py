@@ -0,0 +1,92 @@
+from heapq import nlargest
+
+from rich.text import Text
+from textual import events
+from textual.app import ComposeResult
+from textual.containers import Horizontal, Vertical
+from textual.screen import ModalScreen
+from textual.widgets import Input, Label, OptionList
+from textual.widgets.option_list import Option
+
+from components.menu import Menu
+from connection.connection import Connection
+
+
+class SearchScreen(ModalScreen):
+    """Screen with a palette to jump to a schema, table, view or column."""
+
+    LIMIT = 50
+
+    def __init__(self, connections: [Connection]):
+        self.connections = [conn for conn in connections if conn.loaded]
+        self.matches: list[tuple[float, str, tuple]] = []
+        super().__init__()
+
+    def compose(self) -> ComposeResult:
+        with Vertical(classes="dialog search container"):
+            with Horizontal(classes="container w1"):
+                yield Label(
+                    f"Jump to object ({len(self.connections)} loaded connections)",
+                    id="header",
+                )
+            with Horizontal(classes="container w1"):
+                yield Input(placeholder="Schema, table, view or column", id="query")
+            yield OptionList(id="matches")
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        self.matches = nlargest(
+            self.LIMIT,
+            (
+                (score, conn.id, path)
+                for conn in self.connections
+                for score, path in conn.search(event.value, self.LIMIT)
+            ),
+            key=lambda match: match[0],
+        )
+        options: OptionList = self.query_one(OptionList)
+        options.clear_options()
+        options.add_options(
+            Option(self.label(uid, path)) for _, uid, path in self.matches
+        )
+        if self.matches:
+            options.highlighted = 0
+
+    def label(self, uid: str, path: tuple) -> Text:
+        schema, type, object, column = path
+        if column is not None:
+            prefix = Menu.COLUMN
+        elif object is not None:
+            prefix = Menu.TABLE if type == "table" else Menu.VIEW
+        else:
+            prefix = Menu.SCHEMA
+        return (
+            Text()
+            .append(f"{prefix} ", style="turquoise2")
+            .append(".".join(part for part in (schema, object, column) if part is not None))
+            .append(f"  {self.app.get_connection_by_id(uid).conn.id}", style="dim")
+        )
+
+    def on_key(self, event: events.Key) -> None:
+        options: OptionList = self.query_one(OptionList)
+        match event.key:
+            case "down":
+                options.action_cursor_down()
+            case "up":
+                options.action_cursor_up()
+            case "escape":
+                self.dismiss(None)
+            case _:
+                return
+        event.stop()
+
+    def on_input_submitted(self, event: Input.Submitted) -> None:
+        highlighted = self.query_one(OptionList).highlighted
+        if highlighted is not None:
+            self.choose(highlighted)
+
+    def on_option_list_option_selected(self, event: OptionList.OptionSelected) -> None:
+        self.choose(event.option_index)
+
+    def choose(self, index: int) -> None:
+        _, uid, path = self.matches[index]
+        self.dismiss((uid, path))
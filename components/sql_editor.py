@@ -0,0 +1,107 @@
+from typing import Callable
+
+from textual import events
+from textual.binding import Binding
+from textual.widgets import OptionList, TextArea
+
+
+class CompletionList(OptionList, can_focus=False):
+    """
+    Candidates for the identifier at the editor cursor, shown next to it
+    """
+
+    DEFAULT_CSS = """
+    CompletionList {
+        overlay: screen;
+        position: absolute;
+        constrain: inside inside;
+        display: none;
+        width: auto;
+        min-width: 20;
+        max-width: 60;
+        height: auto;
+        max-height: 10;
+        border: none;
+        padding: 0;
+    }
+    """
+
+
+class SqlEditor(TextArea):
+    """
+    SQL editor completing schema, table, view and column names on ctrl+space or after a dot
+    """
+
+    BINDINGS = [Binding("ctrl+space", "complete", "Complete", show=False)]
+
+    completer: Callable[[str, int, int], tuple[str, list[str]]] = None
+    dropdown: CompletionList = None
+    prefix: str = ""
+
+    def on_mount(self) -> None:
+        self.dropdown = CompletionList()
+        self.screen.mount(self.dropdown)
+
+    def on_unmount(self) -> None:
+        if self.dropdown is not None:
+            self.dropdown.remove()
+            self.dropdown = None
+
+    def on_blur(self) -> None:
+        self.hide_completions()
+
+    def action_complete(self) -> None:
+        if self.completer is None or self.dropdown is None:
+            return
+        row, column = self.cursor_location
+        self.prefix, candidates = self.completer(self.text, row, column)
+        if len(candidates) == 1 and self.dropdown.display is False:
+            self.accept(candidates[0])
+        elif len(candidates) == 0:
+            self.hide_completions()
+        else:
+            self.show_completions(candidates)
+
+    def show_completions(self, candidates: list[str]) -> None:
+        self.dropdown.clear_options()
+        self.dropdown.add_options(candidates)
+        self.dropdown.highlighted = 0
+        x, y = self.cursor_screen_offset
+        self.dropdown.styles.offset = (max(x - len(self.prefix), 0), y + 1)
+        self.dropdown.display = True
+
+    def hide_completions(self) -> None:
+        if self.dropdown is not None:
+            self.dropdown.display = False
+
+    def accept(self, candidate: str) -> None:
+        row, column = self.cursor_location
+        self.replace(candidate, (row, column - len(self.prefix)), (row, column))
+        self.hide_completions()
+
+    def on_text_area_changed(self, event: TextArea.Changed) -> None:
+        row, column = self.cursor_location
+        typed_dot = column > 0 and self.document.get_line(row)[column - 1] == "."
+        if self.dropdown is not None and (self.dropdown.display or typed_dot):
+            self.action_complete()
+
+    async def _on_key(self, event: events.Key) -> None:
+        if self.dropdown is not None and self.dropdown.display:
+            match event.key:
+                case "down":
+                    self.dropdown.action_cursor_down()
+                case "up":
+                    self.dropdown.action_cursor_up()
+                case "enter" | "tab":
+                    highlighted = self.dropdown.highlighted
+                    if highlighted is not None:
+                        self.accept(str(self.dropdown.get_option_at_index(highlighted).prompt))
+                case "escape":
+                    self.hide_completions()
+                case _:
+                    await super()._on_key(event)
+                    return
+            event.stop()
+            event.prevent_default()
+            return
+        await super()._on_key(event)
@@ -1,27 +1,53 @@
 from dataclasses import dataclass
 from json import JSONEncoder
 
+from cryptography.fernet import InvalidToken
+
 import util.crypto as C
 from connectors.connector import Connector, ConnectorType
 from connectors.connector_resolver import resolve_connector
-from connectors.exceptions import NewConnectionError
+from connectors.exceptions import CredentialsError, NewConnectionError
 from util.model import Env
 
 
-@dataclass
+SEALED_FIELDS: tuple[str, ...] = ("database", "host", "user", "passwd")
+
+
+class Sealed:
+    """
+    Credential field holding its ciphertext until first read
+    """
+
+    def __set_name__(self, owner, name: str) -> None:
+        self.name = name
+
+    def __get__(self, obj, objtype=None) -> str:
+        if obj is None:
+            return self
+        if self.name not in obj.plain and self.name in obj.sealed:
+            obj.plain[self.name] = C.decrypt(obj.sealed[self.name])
+        return obj.plain.get(self.name)
+
+    def __set__(self, obj, value: str) -> None:
+        obj.sealed.pop(self.name, None)
+        obj.plain[self.name] = value
+
+
+@dataclass(init=False)
 class Conn:
     """
     Connection details
     """
 
     id: str
-    database: str
-    host: str
+    database: str = Sealed()
+    host: str = Sealed()
     port: int
-    user: str
-    passwd: str
+    user: str = Sealed()
+    passwd: str = Sealed()
     connector_type: ConnectorType
     env: Env
+    options: dict[str, any]
 
     def __init__(
         self,
@@ -33,11 +59,14 @@ class Conn:
         passwd: str,
         connector_type: ConnectorType,
         env: Env,
+        options: dict[str, any] = None,
     ) -> None:
         if id is None or len(id) == 0:
             raise NewConnectionError("'Name' field is required")
 
         self.id = id
+        self.plain: dict[str, str] = dict()
+        self.sealed: dict[str, str] = dict()
         self.database = database
         self.host = host
         self.port = port
@@ -45,6 +74,19 @@ class Conn:
         self.passwd = passwd
         self.connector_type = connector_type
         self.env = env
+        self.options = options or {}
+
+    def unseal(self) -> None:
+        """
+        Decrypts the credentials, failing with a readable error if the key does not match.
+        """
+        try:
+            for name in SEALED_FIELDS:
+                getattr(self, name)
+        except InvalidToken:
+            raise CredentialsError(
+                f"Cannot decrypt the credentials of '{self.id}', check {C.F_KEY} in .env"
+            ) from None
 
     def connector(self) -> Connector:
         return resolve_connector(
@@ -54,37 +96,60 @@ class Conn:
             self.user,
             self.passwd,
             self.connector_type,
+            self.options,
         )
 
     @classmethod
     def from_dict(self, input: str):
+        """
+        Builds a Conn from its saved form. Credentials stay encrypted until first read.
+        """
         id: str = input.get("id")
-        database: str = C.decrypt(input.get("database"))
-        host: str = C.decrypt(input.get("host"))
         port: int = 0 if input.get("port") is None else input.get("port")
-        user: str = C.decrypt(input.get("user"))
-        passwd: str = C.decrypt(input.get("passwd"))
         connector_type: str = str(input.get("type")).upper()
         env: str = str(input.get("env"))
-        return self(
+        options: dict[str, any] = input.get("options")
+        conn = self(
             id,
-            database,
-            host,
+            None,
+            None,
             port,
-            user,
-            passwd,
+            None,
+            None,
             ConnectorType[connector_type],
             Env[env],
+            options,
         )
+        conn.plain = dict()
+        conn.sealed = {
+            "database": input.get("database"),
+            "host": input.get("host"),
+            "user": input.get("user"),
+            "passwd": input.get("passwd"),
+        }
+        return conn
 
-    def encrypt(self) -> None:
-        self.database = C.encrypt(self.database)
-        self.host = C.encrypt(self.host)
-        self.user = C.encrypt(self.user)
-        self.passwd = C.encrypt(self.passwd)
+    def to_dict(self) -> dict:
+        """
+        Saved form of the connection. Credentials reuse their ciphertext unless they changed.
+        """
+        for name in SEALED_FIELDS:
+            if name not in self.sealed:
+                self.sealed[name] = C.encrypt(getattr(self, name))
+        return {
+            "id": self.id,
+            "database": self.sealed["database"],
+            "host": self.sealed["host"],
+            "port": self.port,
+            "user": self.sealed["user"],
+            "passwd": self.sealed["passwd"],
+            "type": self.connector_type.name,
+            "env": self.env.name,
+            "options": self.options,
+        }
 
     def uid(self) -> str:
-        return f"{self.id}_{self.env.value}_{self.database}_{self.user}".lower()
+        return f"{self.id}_{self.env.value}".lower()
 
     def display_name(self) -> str:
         return f"\[{self.env.name}] {self.id}"
@@ -92,13 +157,4 @@ class Conn:
 
 class ConnectionEncoder(JSONEncoder):
     def default(self, obj: Conn):
-        return {
-            "id": obj.id,
-            "database": obj.database,
-            "host": obj.host,
-            "port": obj.port,
-            "user": obj.user,
-            "passwd": obj.passwd,
-            "type": obj.connector_type.name,
-            "env": obj.env.name,
-        }
+        return obj.to_dict()
@@ -1,10 +1,25 @@
 import logging
+import os
+import time
+from functools import partial
+from typing import Any, Callable
 
-import sqlparse
-from textual.widgets import DataTable, Tab, TextArea
+from textual.widgets import TabbedContent, TabPane, TextArea
+from textual.worker import Worker, get_current_worker
 
+from components.results_view import ResultsView
+from components.sql_editor import SqlEditor
 from connection.conn import Conn
+from connection.pager import ResultPager
 from connectors.connector import Connector
+from connectors.exceptions import ExportError
+from connectors.session import ResultCursor, Session
+import util.completion as completion
+import util.export as export
+import util.metadata_store as metadata_store
+import util.sql as sql
+import util.util as U
+from util.model import ExecutionStatus, ExportFormat, StatementKind
 
 logger = logging.getLogger(__name__)
 
@@ -15,34 +30,152 @@ class Connection:
     """
 
     id: str
-    tab: Tab
-    input: TextArea
-    results: DataTable
     conn: Conn
-    connector: Connector
     connected: bool = False
+    validated: bool = False
+    running: bool = False
+    started: float = None
+    finished: float = None
+    session: Session = None
+    pager: ResultPager = None
+    last_query: str = None
+    exporting: bool = False
+    exported: int = 0
+    export_session: Session = None
+    SCRIPT_ROW_LIMIT = 10_000
+    SUMMARY_COLUMNS = ("#", "Statement", "Status", "Rows", "Elapsed")
 
     def __init__(self, conn: Conn):
         self.id = conn.uid()
-        self.tab = Tab(conn.id, id=conn.id)
-        self.input = TextArea.code_editor("select 1", language="sql")
-        self.results = DataTable()
         self.conn = conn
-        self.connector = self.conn.connector()
+        self._input: TextArea = None
+        self._results: ResultsView = None
+        self._output: TabbedContent = None
+        self.summary: ResultsView = None
+        self.splitter = sql.StatementSplitter()
+        self._connector: Connector = None
+        self.workers: list[Worker] = []
         self.connected = False
+        self.validated = False
 
     @classmethod
     def from_conn(self, conn: Conn):
         return self(conn)
 
+    @property
+    def connector(self) -> Connector:
+        """
+        Created on first use, which is also when the credentials get decrypted.
+        """
+        if self._connector is None:
+            self.conn.unseal()
+            self._connector = self.conn.connector()
+        return self._connector
+
+    @connector.setter
+    def connector(self, connector: Connector) -> None:
+        self._connector = connector
+
+    @property
+    def loaded(self) -> bool:
+        """
+        Whether the connector exists, without creating it and decrypting the credentials.
+        """
+        return self._connector is not None
+
+    @property
+    def input(self) -> TextArea:
+        if self._input is None:
+            self._input = SqlEditor.code_editor("select 1", language="sql")
+            self._input.completer = self.complete
+        return self._input
+
+    @property
+    def results(self) -> ResultsView:
+        if self._results is None:
+            self._results = ResultsView()
+        return self._results
+
+    @property
+    def output(self) -> TabbedContent:
+        """
+        The results grid, joined by a summary and a tab per result set while a script ran.
+        """
+        if self._output is None:
+            self._output = TabbedContent(classes="output")
+            self._output.compose_add_child(
+                TabPane("Results", self.results, id="output-results")
+            )
+        return self._output
+
     def clear(self) -> None:
         self.connector.clear()
 
+    def close(self) -> None:
+        if self._connector is None:
+            return
+        logger.info(f"Closing {self.id}: {self.connector.pool_stats()}")
+        self.cancel()
+        self.close_results()
+        if self.connected:
+            self.save_metadata()
+        self.connector.close()
+
+    def release(self) -> None:
+        """
+        Cancels the workers of the connection, closes the connector and drops the widgets,
+        leaving a lightweight descriptor that builds them again on next use.
+        """
+        for worker in self.workers:
+            worker.cancel()
+        self.workers = []
+        self.close()
+        self.close_results()
+        self._connector = None
+        self._input = None
+        self._results = None
+        self._output = None
+        self.summary = None
+        self.connected = False
+        self.validated = False
+
+    def track(self, worker: Worker) -> Worker:
+        self.workers = [item for item in self.workers if not item.is_finished]
+        self.workers.append(worker)
+        return worker
+
+    def restore_metadata(self) -> None:
+        schemas, fingerprints = metadata_store.load(self.conn.uid())
+        self.connector.restore(schemas, fingerprints)
+
+    def revalidate_metadata(self) -> None:
+        """
+        Refreshes schemas whose fingerprint changed. Blocking, meant for a worker thread.
+        """
+        try:
+            changed = self.connector.revalidate()
+            logger.info(f"Revalidated {self.id}, changed schemas: {changed}")
+            self.save_metadata()
+        except Exception as e:
+            logger.error(f"Error: {repr(e)}")
+
+    def forget_metadata(self) -> None:
+        metadata_store.drop(self.conn.uid())
+        self.connected = False
+        self.validated = False
+
+    def save_metadata(self) -> None:
+        metadata_store.save(
+            self.conn.uid(), self.connector.schema_dict, self.connector.fingerprint_dict
+        )
+
     def clear_by_type(self, type: str, schema: str, object: str = None) -> None:
         self.connector.clear_by_type(type, schema, object)
 
     def schemas(self) -> list[str]:
-        self.connected = True
+        if not self.connected:
+            self.connected = True
+            self.restore_metadata()
         return list(map(lambda schema: schema.get_name(), self.connector.schemas()))
 
     def tables(self, schema: str) -> list[str]:
@@ -67,53 +200,415 @@ class Connection:
             )
         )
 
-    def exec_query(self) -> None:
-        query: str = self.input.text
-        parsed = sqlparse.parse(query)
-        if len(parsed) == 0:
-            return
-        self.results.clear()
-        self.results.columns.clear()
-        if parsed[0].get_type() in ["CREATE", "DROP", "INSERT", "UPDATE"]:
-            result = self.connector.execute(query)
-            self.results.add_columns("Status", "msg")
-            self.results.add_rows([(result[0].name, result[1])])
-        elif parsed[0].get_type() in ["SELECT"]:
-            results = self.connector.query_with_names(query)
-            if results and len(results) != 0:
-                if len(results) == 1 and results[0][0] == "error":
-                    self.results.add_columns("Status", "msg")
-                    self.results.add_rows([(results[0][0], results[0][1])])
-                else:
-                    self.results.add_columns(*results[0])
-                    self.results.add_rows(results[1:])
-        elif parsed[0].get_type() in ["UNKNOWN"]:
-            self.results.add_columns("Status", "msg")
-            self.results.add_rows(
-                [
-                    ("Error", "Unknown query type"),
-                    ("", "Raise a bug if the query is valid."),
-                ]
-            )
+    def prefetch(self, schema: str, type: str = None, objects: list[str] = ()) -> None:
+        """
+        Warms the metadata likely to be opened next: tables and views of `schema`, or columns of
+        `objects`. Stops as soon as a query runs or the pool has no spare connection.
+        Blocking, meant for a low-priority worker thread.
+        """
+        worker = get_current_worker()
+        if type is None:
+            steps = [
+                partial(self.connector.tables, schema),
+                partial(self.connector.views, schema),
+            ]
         else:
-            self.results.add_columns("Status", "msg")
-            self.results.add_rows(
-                [
-                    ("Error", "Unhandled query type"),
-                    ("QueryType", f"{parsed[0].get_type()}"),
+            steps = [partial(self.connector.columns, schema, obj, type) for obj in objects]
+        for step in steps:
+            if worker.is_cancelled or self.running or not self.connector.pool.has_spare():
+                return
+            try:
+                step()
+            except Exception as e:
+                logger.error(f"Error: {repr(e)}")
+                return
+
+    def current_statement(self) -> str:
+        """
+        The selected text, or else the statement under the cursor.
+        """
+        if len(self.input.selected_text.strip()) != 0:
+            return self.input.selected_text
+        text: str = self.input.text
+        offset: int = self.input.document.get_index_from_location(self.input.cursor_location)
+        span = self.splitter.statement_at(text, offset)
+        return "" if span is None else text[span[0] : span[1]]
+
+    def complete(self, text: str, row: int, column: int) -> tuple[str, list[str]]:
+        """
+        (prefix, candidates) for the identifier at the cursor, from the metadata loaded so far.
+        Columns of the tables referenced by the current statement come first.
+        """
+        qualifier, prefix = completion.context(text, row, column)
+        if self._connector is None:
+            return (prefix, [])
+        key = prefix.lower()
+        tables = completion.references(completion.statement_at(text, row, column))
+        if qualifier is not None:
+            obj = self.connector.find_object(tables.get(qualifier.lower(), qualifier))
+            if obj is not None and obj.columns is not None:
+                names = [column.name for column in obj.columns]
+            else:
+                sch = self.connector.schema_dict.get(qualifier.lower())
+                names = [
+                    obj.name
+                    for objects in ((sch.tables, sch.views) if sch is not None else ())
+                    for obj in (objects or {}).values()
                 ]
+            return (prefix, [name for name in names if name.lower().startswith(key)])
+        if len(prefix) == 0:
+            return (prefix, [])
+        candidates: list[str] = []
+        for name in set(tables.values()):
+            obj = self.connector.find_object(name)
+            if obj is not None and obj.columns is not None:
+                candidates.extend(
+                    column.name
+                    for column in obj.columns
+                    if column.name.lower().startswith(key)
+                )
+        candidates.extend(
+            self.connector.completions.lookup(prefix, ("table", "view", "schema"))
+        )
+        candidates.extend(self.connector.completions.lookup(prefix, ("column",)))
+        return (prefix, list(dict.fromkeys(candidates)))
+
+    def search(self, query: str, limit: int = 50) -> list[tuple[float, tuple]]:
+        """
+        Fuzzy matches of `query` among the objects loaded so far, as (score, path).
+        """
+        if not self.loaded:
+            return []
+        return self.connector.search_index.search(query, limit)
+
+    def start(self) -> None:
+        self.running = True
+        self.started = time.monotonic()
+        self.finished = None
+
+    def stop(self) -> None:
+        if self.running:
+            self.running = False
+            self.finished = time.monotonic()
+
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    def exec_query(self, query: str, post: Callable[..., Any]) -> None:
+        """
+        Runs the query against the connector, classified by its leading keywords. Blocking,
+        meant for a worker thread; `post` schedules a call on the UI thread.
+        """
+        self.last_query = query
+        try:
+            post(self.reset_output)
+            statements: list[str] = sql.statements(query)
+            if len(statements) > 1:
+                self.run_script(statements, post)
+                return
+            kind: StatementKind = sql.classify(query)
+            match kind:
+                case StatementKind.COMMAND | StatementKind.UTILITY:
+                    self.run_session(query, post, fetch=False)
+                case StatementKind.QUERY:
+                    self.run_session(query, post, fetch=True)
+                case _:
+                    post(
+                        self.results.show,
+                        ("Status", "msg"),
+                        [
+                            ("Error", "Unknown query type"),
+                            ("Keyword", f"{sql.keyword(query)}"),
+                            ("", "Raise a bug if the query is valid."),
+                        ],
+                    )
+        except Exception as e:
+            logger.error(f"Error: {repr(e)}")
+            post(self.results.show, ("Status", "msg"), [("Error", repr(e))])
+        finally:
+            self.stop()
+
+    def run_session(self, query: str, post: Callable[..., Any], fetch: bool) -> None:
+        session: Session = None
+        try:
+            with self.connector.session() as session:
+                self.session = session
+                if not fetch:
+                    cursor: ResultCursor = session.execute(query)
+                    if cursor.names is not None:
+                        # RETURNING, PRAGMA, EXPLAIN and the like: shown once, never re-run to page
+                        limit: int = self.fetch_limit() or self.SCRIPT_ROW_LIMIT
+                        post(self.results.show, cursor.names, cursor.fetch(limit))
+                        return
+                    affected = f"{cursor.rowcount} rows" if cursor.rowcount >= 0 else None
+                    post(
+                        self.results.show,
+                        ("Status", "msg"),
+                        [(ExecutionStatus.Success.name, affected)],
+                    )
+                    return
+                estimate: int | None = session.estimate(query)
+                # pages are cached, so without SCROLL going back only re-runs the query
+                cursor: ResultCursor = session.execute(
+                    query, server_side=True, scrollable=not sql.locks_rows(query)
+                )
+                pager = ResultPager(cursor, self.fetch_limit())
+                self.pager = pager
+                post(self.results.attach, cursor.names or (), pager, pager.read(0), estimate)
+                self.stop()
+                pager.serve(partial(post, self.results.add_page))
+                session.check_cancelled()
+        except Exception as e:
+            if session is not None and session.cancelled:
+                post(
+                    self.results.show,
+                    ("Status", "msg"),
+                    [("Cancelled", f"{session.fetched()} rows received before cancel")],
+                )
+                return
+            logger.error(f"Error: {repr(e)}")
+            post(
+                self.results.show,
+                ("Status", "msg"),
+                [(ExecutionStatus.Failure.name, repr(e))],
             )
+        finally:
+            self.session = None
+
+    def run_script(self, statements: list[str], post: Callable[..., Any]) -> None:
+        """
+        Runs `statements` in order on one session and stops at the first failure. They share
+        one transaction unless the connection option "script_transaction" is off, in which
+        case each statement is committed on its own. A script with BEGIN, COMMIT or ROLLBACK
+        of its own runs in driver autocommit instead, and is never committed by the client;
+        a transaction it leaves open is rolled back and reported.
+        """
+        transaction: bool = self.conn.options.get("script_transaction", True)
+        controlled: bool = any(
+            sql.keyword(statement) in sql.TRANSACTION_CONTROL for statement in statements
+        )
+        limit: int = self.fetch_limit() or self.SCRIPT_ROW_LIMIT
+        summary: list[tuple] = []
+        session: Session = None
+        left_open = False
+        shown: float = time.monotonic()
+        post(self.start_script)
+        try:
+            with self.connector.session() as session:
+                self.session = session
+                if controlled:
+                    session.set_autocommit()
+                elif transaction:
+                    session.begin()
+                for number, statement in enumerate(statements, 1):
+                    session.check_cancelled()
+                    started = time.monotonic()
+                    try:
+                        rows = self.run_statement(session, number, statement, limit, post)
+                        if not transaction and not controlled:
+                            session.conn.commit()
+                    except Exception as e:
+                        status = "Cancelled" if session.cancelled else f"Failure: {e!r}"
+                        summary.append(self.summary_row(number, statement, status, None, started))
+                        left_open = controlled and session.in_transaction()
+                        raise
+                    summary.append(self.summary_row(number, statement, "Success", rows, started))
+                    if time.monotonic() - shown > 0.2:
+                        shown = time.monotonic()
+                        post(self.summary.show, self.SUMMARY_COLUMNS, list(summary))
+                left_open = controlled and session.in_transaction()
+            if left_open:
+                summary.append(("", "Transaction left open, rolled back", "", "", ""))
+            post(self.summary.show, self.SUMMARY_COLUMNS, list(summary))
+        except Exception as e:
+            logger.error(f"Error: {repr(e)}")
+            if controlled:
+                stopped = f"Stopped at statement {len(summary)}"
+                if left_open:
+                    stopped += ", its open transaction was rolled back"
+                summary.append(("", stopped, "", "", ""))
+            elif transaction:
+                summary.append(("", "Rolled back, no statement was applied", "", "", ""))
+            elif len(summary) > 1:
+                stopped = f"Stopped at statement {len(summary)}, earlier ones were committed"
+                summary.append(("", stopped, "", "", ""))
+            post(self.summary.show, self.SUMMARY_COLUMNS, list(summary))
+        finally:
+            self.session = None
+            done = sum(1 for row in summary if row[2] == "Success")
+            message = f"{done} of {len(statements)} statements succeeded"
+            if left_open:
+                message += ", open transaction rolled back"
+            post(self.results.show, ("Status", "msg"), [("Script", message)])
+
+    def run_statement(
+        self,
+        session: Session,
+        number: int,
+        statement: str,
+        limit: int,
+        post: Callable[..., Any],
+    ) -> int | None:
+        """
+        Runs one statement of a script and returns the rows it affected or returned.
+        Up to `limit` rows of a result set are shown in a tab of their own.
+        """
+        kind: str = sql.keyword(statement)
+        # named cursors need a transaction, which autocommit does not keep open
+        cursor: ResultCursor = session.execute(
+            statement,
+            server_side=not session.autocommit
+            and sql.classify(statement) == StatementKind.QUERY,
+            scrollable=False,
+        )
+        if cursor.names is None:
+            return cursor.rowcount if cursor.rowcount >= 0 else None
+        rows: list[tuple] = cursor.fetch(limit)
+        post(self.add_result, f"#{number} {kind}", cursor.names, rows)
+        return len(rows)
+
+    def summary_row(
+        self, number: int, statement: str, status: str, rows: int | None, started: float
+    ) -> tuple:
+        line: str = " ".join(statement.split())
+        return (
+            number,
+            line if len(line) <= 60 else f"{line[:59]}…",
+            status,
+            rows,
+            f"{(time.monotonic() - started) * 1000:.1f} ms",
+        )
 
-    def exec_preview(self, schema: str, table: str) -> None:
-        self.clear()
+    async def reset_output(self) -> None:
+        """
+        Drops the tabs of the previous script. Runs on the UI thread.
+        """
+        if self._output is None or not self._output.is_mounted:
+            return
+        self._output.active = "output-results"
+        self._output.remove_class("script")
+        for pane in list(self._output.query(TabPane)):
+            if pane.id != "output-results":
+                await self._output.remove_pane(pane.id)
+
+    async def start_script(self) -> None:
+        self.summary = ResultsView()
+        await self._output.add_pane(TabPane("Summary", self.summary, id="output-summary"))
+        self._output.add_class("script")
+        self._output.active = "output-summary"
+
+    async def add_result(self, title: str, names: tuple, rows: list[tuple]) -> None:
+        view = ResultsView()
+        view.show(names, rows)
+        await self._output.add_pane(
+            TabPane(title, view, id=f"output-{self._output.tab_count}")
+        )
+
+    def export(self, query: str, path: str, format: ExportFormat) -> int:
+        """
+        Streams the rows of `query` to `path` on a read-only session of its own, bypassing
+        the results grid. Returns the number of rows written. Blocking, meant for a worker
+        thread.
+        """
+        self.exported = 0
+        writer = None
+        try:
+            query = self.export_query(query)
+            with self.connector.session(read_only=True) as session:
+                self.export_session = session
+                # EXPLAIN, SHOW and the like cannot back a server-side cursor
+                cursor: ResultCursor = session.execute(
+                    query,
+                    server_side=sql.classify(query) == StatementKind.QUERY,
+                    scrollable=False,
+                )
+                if cursor.names is None:
+                    raise ExportError("The statement returned no result set")
+                writer = export.open_writer(format, path, cursor.names)
+                try:
+                    for batch in cursor.batches(export.BATCH_SIZE):
+                        writer.write(batch)
+                        self.exported += len(batch)
+                finally:
+                    writer.close()
+                session.check_cancelled()
+        except BaseException:
+            if writer is not None and os.path.isfile(path):
+                os.unlink(path)
+            raise
+        finally:
+            self.export_session = None
+            self.exporting = False
+        return self.exported
+
+    def export_query(self, query: str) -> str:
+        """
+        The statement of `query` to export. Only a single read-only statement qualifies, a
+        query or a utility such as EXPLAIN, since an export runs it again.
+        """
+        statements: list[str] = sql.statements(query)
+        if len(statements) != 1:
+            raise ExportError("Only a single statement can be exported")
+        if sql.classify(statements[0]) not in [StatementKind.QUERY, StatementKind.UTILITY]:
+            raise ExportError(
+                "Only a read-only statement can be exported, running this one again could "
+                "change data"
+            )
+        return statements[0]
+
+    def fetch_limit(self) -> int | None:
+        limit = self.conn.options.get("fetch_limit", U.get_fetch_limit(self.conn.env))
+        return limit if limit else None
+
+    def fetch_more(self) -> bool:
+        return self.results.extend_limit(self.fetch_limit())
+
+    def fetch_all(self) -> bool:
+        return self.results.extend_limit(None)
+
+    def cancel(self) -> bool:
+        """
+        Cancels the running query or export. A finished query whose grid is still paging
+        is left alone.
+        """
+        cancelled = False
+        export_session: Session = self.export_session
+        if self.exporting and export_session is not None:
+            export_session.cancel()
+            cancelled = True
+        session: Session = self.session
+        if self.running and session is not None:
+            session.cancel()
+            self.close_results()
+            cancelled = True
+        return cancelled
+
+    def stop_paging(self) -> int | None:
+        return self.results.stop()
+
+    def close_results(self) -> None:
+        pager: ResultPager = self.pager
+        if pager is not None:
+            pager.close()
+            self.pager = None
+
+    def clear_results(self) -> None:
+        self.close_results()
+        self.results.clear()
+
+    def load_preview(self, schema: str, table: str) -> None:
+        self.clear_results()
         self.input.text = self.connector.preview_query(schema, table)
         self.format_query()
-        self.exec_query()
 
     def test(self) -> None:
         self.connector.test()
 
     def format_query(self) -> None:
+        import sqlparse
+
         query: str = self.input.text
         formatted = sqlparse.format(query, reindent=True, keyword_case="upper")
         self.input.text = formatted
@@ -0,0 +1,92 @@
+import logging
+import queue
+import time
+from typing import Callable
+
+from connectors.session import ResultCursor
+
+logger = logging.getLogger(__name__)
+
+
+class ResultPager:
+    """
+    Serves pages of an open result cursor, from the worker thread that opened it
+    """
+
+    PAGE_SIZE = 500
+    # an open result holds a pooled connection, and on PostgreSQL a transaction
+    IDLE_TIMEOUT = 60.0
+
+    def __init__(
+        self,
+        cursor: ResultCursor,
+        limit: int | None = None,
+        page_size: int = PAGE_SIZE,
+        idle_timeout: float = IDLE_TIMEOUT,
+    ):
+        self.cursor = cursor
+        self.limit = limit
+        self.page_size = page_size
+        self.idle_timeout = idle_timeout
+        self.rows = 0
+        self.total: int | None = None
+        self.tail: (int, list[tuple]) = None
+        self.closed = False
+        self.expired = False
+        self.requests: queue.SimpleQueue[int | None] = queue.SimpleQueue()
+
+    def request(self, page: int) -> None:
+        self.requests.put(page)
+
+    def close(self) -> None:
+        self.closed = True
+        self.requests.put(None)
+
+    def limited(self) -> bool:
+        return self.total is None and self.limit is not None and self.rows >= self.limit
+
+    def read(self, page: int) -> list[tuple]:
+        start = page * self.page_size
+        end = start + self.page_size
+        if self.limit is not None:
+            end = min(end, self.limit)
+        if start >= end or start > self.rows:
+            return []
+        if self.total is not None and start >= self.total:
+            return []
+        rows: list[tuple] = []
+        if (
+            self.tail is not None
+            and self.tail[0] == page
+            and self.cursor.position == start + len(self.tail[1])
+        ):
+            rows = list(self.tail[1])
+        elif start != self.cursor.position:
+            self.cursor.seek(start)
+        wanted = end - start - len(rows)
+        fetched = self.cursor.fetch(wanted) if wanted > 0 else []
+        rows.extend(fetched)
+        self.rows = max(self.rows, start + len(rows))
+        if len(fetched) < wanted:
+            self.total = start + len(rows)
+        self.tail = (page, rows) if len(rows) < self.page_size else None
+        return rows
+
+    def serve(self, post: Callable[["ResultPager", int, list[tuple]], None]) -> None:
+        """
+        Answers page requests until closed, or until none came for `idle_timeout` seconds.
+        Blocking.
+        """
+        deadline = time.monotonic() + self.idle_timeout
+        while not self.closed:
+            try:
+                page = self.requests.get(timeout=1.0)
+            except queue.Empty:
+                if time.monotonic() >= deadline:
+                    logger.info(f"Closing result idle for {self.idle_timeout:.0f}s")
+                    self.expired = self.closed = True
+                continue
+            if page is None or self.closed:
+                break
+            post(self, page, self.read(page))
+            deadline = time.monotonic() + self.idle_timeout
@@ -1,8 +1,19 @@
+import logging
+import threading
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Callable
+from functools import partial
+from typing import Any, Callable, Iterator
 
+from connectors.exceptions import PoolTimeout
+from connectors.metadata_cache import METADATA_CACHE
+from connectors.pool import ConnectionPool
+from connectors.session import ResultCursor, Session
+from util.completion import IdentifierIndex
 from util.model import Column, ConnectorType, ExecutionStatus, Schema, Table
+from util.search import ObjectIndex
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -17,12 +28,87 @@ class Connector(ABC):
         self.passw = passw
         self.type = type
         self.schema_dict: dict[str, Schema] = dict()
+        self.introspection: str = "lazy"
+        self.fingerprint_dict: dict[str, str] = dict()
+        # levels ("tables", "views") per schema that still hold restored, unverified metadata
+        self.restored: dict[str, set[str]] = dict()
+        self.completions: IdentifierIndex = IdentifierIndex()
+        self.search_index: ObjectIndex = ObjectIndex()
+        self._pool: ConnectionPool = None
+        self._pool_lock = threading.Lock()
+        self.closed = False
 
     @property
     @abstractmethod
     def connection_string(self) -> str:
         pass
 
+    @abstractmethod
+    def connect(self) -> Any:
+        pass
+
+    def check_connection(self, conn: Any) -> bool:
+        return True
+
+    @abstractmethod
+    def interrupt(self, conn: Any) -> None:
+        pass
+
+    def open_cursor(self, conn: Any, server_side: bool = False, scrollable: bool = True) -> Any:
+        return conn.cursor()
+
+    def scroll(self, cursor: Any, position: int) -> bool:
+        return False
+
+    def estimate_rows(self, conn: Any, query: str) -> int | None:
+        return None
+
+    def begin(self, conn: Any) -> None:
+        """
+        Opens a transaction covering every following statement, DDL included.
+        """
+        pass
+
+    def autocommit(self, conn: Any, on: bool) -> None:
+        """
+        Switches the driver to autocommit, so BEGIN, COMMIT and ROLLBACK sent as statements
+        are the only transaction control.
+        """
+        pass
+
+    def in_transaction(self, conn: Any) -> bool:
+        """
+        Whether a transaction is open on `conn`, such as one a script began and never ended.
+        """
+        return False
+
+    def session(self, read_only: bool = False) -> Session:
+        return Session(self, read_only)
+
+    def create_pool(self) -> ConnectionPool:
+        return ConnectionPool(self.connect, self.check_connection)
+
+    @property
+    def pool(self) -> ConnectionPool:
+        with self._pool_lock:
+            if self.closed:
+                # a worker outliving the connector must not open handles nothing will close
+                raise PoolTimeout("Connection pool is closed")
+            if self._pool is None or self._pool.closed:
+                self._pool = self.create_pool()
+            return self._pool
+
+    def pool_stats(self) -> dict[str, int]:
+        return {} if self._pool is None else self._pool.stats()
+
+    def close(self) -> None:
+        METADATA_CACHE.discard(id(self))
+        with self._pool_lock:
+            self.closed = True
+            if self._pool is not None:
+                self._pool.close()
+                self._pool = None
+
     @property
     @abstractmethod
     def get_schemas(self) -> Callable[[], list[Schema]]:
@@ -43,6 +129,23 @@ class Connector(ABC):
     def get_columns(self) -> Callable[[str, str], list[Column]]:
         pass
 
+    @property
+    @abstractmethod
+    def get_snapshot(self) -> Callable[[str | None], list[tuple]]:
+        """
+        Rows of (schema, object, 'table' | 'view', column, type, not_null, pk, default)
+        for one schema, or for every schema when None.
+        """
+        pass
+
+    @property
+    @abstractmethod
+    def get_fingerprints(self) -> Callable[[], dict[str, str]]:
+        """
+        Cheap per-schema change signal, compared against the cached metadata.
+        """
+        pass
+
     @property
     @abstractmethod
     def preview_query(self) -> Callable[[str, str], str]:
@@ -54,19 +157,33 @@ class Connector(ABC):
         pass
 
     def clear(self) -> None:
+        METADATA_CACHE.discard(id(self))
         self.schema_dict.clear()
+        self.restored.clear()
+        self.completions.clear()
+        self.search_index.clear()
 
     def clear_by_type(self, type: str, schema: str, object: str = None) -> None:
         match type:
             case "schema":
-                self.schema_dict[schema] = Schema(schema.lower(), None, None)
+                METADATA_CACHE.discard(id(self), schema.lower())
+                self.search_index.discard(schema)
+            case "tables" | "views":
+                METADATA_CACHE.discard(id(self), schema.lower())
+                self.search_index.discard(schema, type[:-1])
+            case "table" | "view":
+                METADATA_CACHE.discard(*self.cache_key(schema, type, object))
+                self.search_index.discard(schema, type, object)
+        match type:
+            case "schema":
+                self.schema_dict[schema.lower()] = Schema(schema, None, None)
             case "table":
                 self.schema_dict.get(schema.lower()).tables[object.lower()] = Table(
-                    object.lower, None
+                    object, None
                 )
             case "view":
                 self.schema_dict.get(schema.lower()).views[object.lower()] = Table(
-                    object.lower, None
+                    object, None
                 )
             case "schemas":
                 self.clear()
@@ -75,33 +192,187 @@ class Connector(ABC):
             case "views":
                 self.schema_dict.get(schema.lower()).views = None
 
+    def cache_key(self, schema: str, kind: str, name: str = None) -> tuple:
+        return (id(self), schema.lower(), kind, None if name is None else name.lower())
+
+    def track(self, schema: Schema, kind: str) -> None:
+        """
+        Registers a loaded level of `schema` ("tables" or "views"), and the columns already
+        loaded below it, with the shared metadata cache.
+        """
+        objects: dict[str, Table] = getattr(schema, kind)
+        self.index(schema)
+        METADATA_CACHE.put(
+            self.cache_key(schema.name, kind),
+            len(objects),
+            partial(setattr, schema, kind, None),
+        )
+        for obj in objects.values():
+            if obj.columns is not None:
+                METADATA_CACHE.put(
+                    self.cache_key(schema.name, kind[:-1], obj.name),
+                    len(obj.columns),
+                    partial(setattr, obj, "columns", None),
+                )
+
+    def index(self, schema: Schema) -> None:
+        """
+        Adds the loaded names of `schema`, its objects and their columns to the completion
+        and search indexes.
+        """
+        self.completions.add("schema", [schema.name])
+        self.search_index.add([(schema.name, None, None, None)])
+        for kind, objects in (("table", schema.tables), ("view", schema.views)):
+            if objects is None:
+                continue
+            self.completions.add(kind, [obj.name for obj in objects.values()])
+            self.search_index.add(
+                (schema.name, kind, obj.name, None) for obj in objects.values()
+            )
+            for obj in objects.values():
+                if obj.columns is not None:
+                    self.index_columns(schema.name, kind, obj)
+
+    def index_columns(self, schema: str, kind: str, obj: Table) -> None:
+        self.completions.add("column", [column.name for column in obj.columns])
+        self.search_index.add(
+            [(schema, kind, obj.name, None)]
+            + [(schema, kind, obj.name, column.name) for column in obj.columns]
+        )
+
+    def find_object(self, name: str) -> Table | None:
+        """
+        The loaded table or view called `name`, optionally schema qualified.
+        """
+        schema_name, _, object_name = name.lower().rpartition(".")
+        schemas: list[Schema] = (
+            [self.schema_dict.get(schema_name)]
+            if schema_name
+            else list(self.schema_dict.values())
+        )
+        for sch in schemas:
+            for objects in (sch.tables, sch.views) if sch is not None else ():
+                if objects is not None and object_name in objects:
+                    return objects[object_name]
+        return None
+
     def schemas(self) -> list[Schema]:
         if len(self.schema_dict) == 0:
             result: dict[str, Schema] = dict()
             for itm in self.get_schemas():
                 result[itm.name.lower()] = itm
             self.schema_dict = result
+            for itm in result.values():
+                self.index(itm)
+            if self.introspection == "database":
+                self.snapshot()
         return list(self.schema_dict.values())
 
+    def snapshot(self, schema: str = None) -> None:
+        """
+        Loads tables, views and columns of one schema, or of the whole database, in a single pass.
+        """
+        result: dict[str, Schema] = dict()
+        if schema is not None:
+            result[schema.lower()] = Schema(schema, dict(), dict())
+        for schema_name, name, kind, *column in self.get_snapshot(schema):
+            sch: Schema = result.setdefault(
+                schema_name.lower(), Schema(schema_name, dict(), dict())
+            )
+            objects: dict[str, Table] = sch.tables if kind == "table" else sch.views
+            obj: Table = objects.setdefault(name.lower(), Table(name, []))
+            if column[0] is not None:
+                obj.columns.append(
+                    Column(column[0], column[1], bool(column[2]), bool(column[3]), column[4])
+                )
+        for key, sch in self.schema_dict.items():
+            if schema is None and key not in result:
+                result[key] = Schema(sch.name, dict(), dict())
+        for key in result:
+            self.restored.pop(key, None)
+            METADATA_CACHE.discard(id(self), key)
+            self.search_index.discard(key)
+            self.index(result[key])
+        self.schema_dict.update(result)
+
+    def restore(self, schemas: dict[str, Schema], fingerprints: dict[str, str]) -> None:
+        if len(self.schema_dict) == 0 and len(schemas) != 0:
+            self.schema_dict = schemas
+            self.fingerprint_dict = fingerprints
+            self.restored = {
+                key: {kind for kind in ("tables", "views") if getattr(sch, kind) is not None}
+                for key, sch in schemas.items()
+            }
+            for itm in schemas.values():
+                self.index(itm)
+
+    def revalidate(self) -> list[str]:
+        """
+        Compares schema fingerprints with the cached ones and drops the restored levels of
+        the schemas that changed. Levels loaded live since the restore are left alone.
+        """
+        current: dict[str, str] = dict()
+        for name, fingerprint in self.get_fingerprints().items():
+            current[name.lower()] = fingerprint
+            if name.lower() not in self.schema_dict:
+                self.schema_dict[name.lower()] = Schema(name, None, None)
+                self.index(self.schema_dict[name.lower()])
+        changed: list[str] = []
+        for key in list(self.schema_dict.keys()):
+            if key not in current:
+                METADATA_CACHE.discard(id(self), key)
+                self.search_index.discard(key)
+                del self.schema_dict[key]
+                continue
+            previous = self.fingerprint_dict.get(key)
+            if previous is not None and previous != current[key]:
+                levels: set[str] = self.restored.pop(key, set())
+                if len(levels) == 0:
+                    continue
+                changed.append(key)
+                schema: Schema = self.schema_dict[key]
+                for kind in levels:
+                    METADATA_CACHE.discard(id(self), key, kind[:-1])
+                    self.search_index.discard(schema.name, kind[:-1])
+                    setattr(schema, kind, None)
+                if self.introspection != "lazy":
+                    self.snapshot(schema.name)
+        self.fingerprint_dict = current
+        return changed
+
     def tables(self, schema: str) -> list[Table]:
         self.schemas()
         val: Schema = self.schema_dict.get(schema.lower())
+        fresh = METADATA_CACHE.check(self.cache_key(val.name, "tables"))
+        if val.tables is None and self.introspection == "schema":
+            self.snapshot(val.name)
+            val = self.schema_dict.get(schema.lower())
         if val.tables is None:
             tmp: dict[str, Table] = dict()
             for itm in self.get_tables(val.name):
                 tmp[itm.name.lower()] = itm
             val.tables = tmp
+            self.restored.get(schema.lower(), set()).discard("tables")
+        if not fresh:
+            self.track(val, "tables")
         self.schema_dict[schema] = val
         return list(self.schema_dict.get(schema).tables.values())
 
     def views(self, schema: str) -> list[Table]:
         self.schemas()
         val: Schema = self.schema_dict.get(schema.lower())
+        fresh = METADATA_CACHE.check(self.cache_key(val.name, "views"))
+        if val.views is None and self.introspection == "schema":
+            self.snapshot(val.name)
+            val = self.schema_dict.get(schema.lower())
         if val.views is None:
             tmp: dict[str, Table] = dict()
             for itm in self.get_views(val.name):
                 tmp[itm.name.lower()] = itm
             val.views = tmp
+            self.restored.get(schema.lower(), set()).discard("views")
+        if not fresh:
+            self.track(val, "views")
         self.schema_dict[schema] = val
         return list(self.schema_dict.get(schema).views.values())
 
@@ -112,15 +383,29 @@ class Connector(ABC):
         match type:
             case "table":
                 tbl: Table = sch.tables.get(table.lower())
+                key = self.cache_key(schema, "table", table)
+                fresh = METADATA_CACHE.check(key)
                 if tbl.columns is None:
                     tbl.columns = self.get_columns(schema, table)
+                if not fresh:
+                    METADATA_CACHE.put(
+                        key, len(tbl.columns), partial(setattr, tbl, "columns", None)
+                    )
+                    self.index_columns(sch.name, type, tbl)
                 return list(
                     self.schema_dict.get(schema).tables.get(table.lower()).columns
                 )
             case "view":
                 tbl: Table = sch.views.get(table.lower())
+                key = self.cache_key(schema, "view", table)
+                fresh = METADATA_CACHE.check(key)
                 if tbl.columns is None:
                     tbl.columns = self.get_columns(schema, table)
+                if not fresh:
+                    METADATA_CACHE.put(
+                        key, len(tbl.columns), partial(setattr, tbl, "columns", None)
+                    )
+                    self.index_columns(sch.name, type, tbl)
                 return list(
                     self.schema_dict.get(schema).views.get(table.lower()).columns
                 )
@@ -133,6 +418,26 @@ class Connector(ABC):
     def query(self, query: str) -> [()]:
         pass
 
-    @abstractmethod
     def query_with_names(self, query: str) -> [()]:
-        pass
+        try:
+            rows: [()] = []
+            for batch in self.stream(query):
+                rows.extend(batch)
+            return rows
+        except Exception as e:
+            logger.error(f"Error: {repr(e)}")
+            return [("error", repr(e))]
+
+    def stream(
+        self,
+        query: str,
+        batch_size: int = ResultCursor.BATCH_SIZE,
+        server_side: bool = False,
+    ) -> Iterator[list[tuple]]:
+        """
+        Yields the column names as a single-row batch, followed by batches of rows.
+        """
+        with self.session() as session:
+            cursor: ResultCursor = session.execute(query, server_side)
+            yield [cursor.names or ()]
+            yield from cursor.batches(batch_size)
@@ -1,24 +1,35 @@
 from connectors.connector import Connector, ConnectorType
 from connectors.dummy_connector import DummyConnector
 from connectors.exceptions import NewConnectionError
-from connectors.postgres_connector import PostgreSqlConnector
 from connectors.sqlite_connector import SqliteConnector
 
 
 def resolve_connector(
-    database: str, host: str, port, user: str, passw: str, type: ConnectorType
+    database: str,
+    host: str,
+    port,
+    user: str,
+    passw: str,
+    type: ConnectorType,
+    options: dict[str, any] = None,
 ) -> Connector:
+    options = options or {}
     match type:
         case ConnectorType.POSTGRESQL:
             required_fields_check(
                 {"Database": database, "Host": host, "Port": port, "User": user, "Password": passw}
             )
-            return PostgreSqlConnector(database, host, port, user, passw)
+            # deferred: psycopg is the most expensive import of the application
+            from connectors.postgres_connector import PostgreSqlConnector
+
+            connector = PostgreSqlConnector(database, host, port, user, passw)
         case ConnectorType.SQLITE:
             required_fields_check({"Database": database})
-            return SqliteConnector(database)
+            connector = SqliteConnector(database, options.get("pragmas"))
         case _:
             return DummyConnector()
+    connector.introspection = options.get("introspection", "lazy")
+    return connector
 
 
 def required_fields_check(args: dict[str, any]) -> bool:
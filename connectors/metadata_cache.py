@@ -0,0 +1,122 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+MAX_OBJECTS: str = "METADATA_CACHE_MAX_OBJECTS"
+TTL: str = "METADATA_CACHE_TTL"
+
+
+class CacheEntry:
+    def __init__(self, weight: int, expires: float, unload: Callable[[], None]):
+        self.weight = weight
+        self.expires = expires
+        self.unload = unload
+
+
+class MetadataCache:
+    """
+    Bounds the metadata loaded by all connectors, with per-entry TTL and LRU eviction.
+    Keys are (owner, schema, kind, name); a schema-level key owns the column-level keys below it.
+    """
+
+    def __init__(self, max_objects: int = 500_000, ttl: float = 3600.0):
+        self.max_objects = max_objects
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.weight = 0
+        self._entries: OrderedDict[tuple, CacheEntry] = OrderedDict()
+        self._children: dict[tuple, set[tuple]] = dict()
+        self._lock = threading.RLock()
+
+    def configure(self) -> None:
+        if os.getenv(MAX_OBJECTS):
+            self.max_objects = int(os.getenv(MAX_OBJECTS))
+        if os.getenv(TTL):
+            self.ttl = float(os.getenv(TTL))
+
+    def check(self, key: tuple) -> bool:
+        """
+        True when the entry is cached and fresh. Expired entries are unloaded.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires < time.monotonic():
+                self.expirations += 1
+                self._remove(key, unload=True)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return True
+
+    def put(self, key: tuple, weight: int, unload: Callable[[], None]) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key, unload=False)
+            self._entries[key] = CacheEntry(weight, time.monotonic() + self.ttl, unload)
+            self.weight += weight
+            parent = self.parent(key)
+            if parent is not None:
+                self._children.setdefault(parent, set()).add(key)
+            while self.weight > self.max_objects and len(self._entries) > 1:
+                oldest = next(iter(self._entries))
+                if oldest == key or oldest == parent:
+                    self._entries.move_to_end(oldest)
+                    oldest = next(iter(self._entries))
+                    if oldest == key or oldest == parent:
+                        break
+                self.evictions += 1
+                self._remove(oldest, unload=True)
+
+    def discard(self, *prefix) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[: len(prefix)] == prefix]:
+                if key in self._entries:
+                    self._remove(key, unload=False)
+
+    def parent(self, key: tuple) -> tuple | None:
+        match key[2]:
+            case "table":
+                return key[:2] + ("tables", None)
+            case "view":
+                return key[:2] + ("views", None)
+        return None
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "entries": len(self._entries),
+            "objects": self.weight,
+            "max_objects": self.max_objects,
+        }
+
+    def _remove(self, key: tuple, unload: bool) -> None:
+        entry = self._entries.pop(key)
+        self.weight -= entry.weight
+        parent = self.parent(key)
+        if parent is not None and parent in self._children:
+            self._children[parent].discard(key)
+        for child in self._children.pop(key, set()):
+            if child in self._entries:
+                self._remove(child, unload=False)
+        if unload:
+            try:
+                entry.unload()
+            except Exception as e:
+                logger.error(f"Error: {repr(e)}")
+
+
+METADATA_CACHE = MetadataCache()
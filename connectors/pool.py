@@ -0,0 +1,150 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable
+
+from connectors.exceptions import PoolTimeout
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    """
+    Bounded pool of database connections owned by a connector
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        check: Callable[[Any], bool] = None,
+        max_size: int = 4,
+        max_idle: float = 300.0,
+        check_after: float = 30.0,
+        timeout: float = 30.0,
+    ):
+        self.factory = factory
+        self.check = check
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.check_after = check_after
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+        self.closed = False
+        self._idle: deque[(Any, float)] = deque()
+        self._in_use = 0
+        self._lock = threading.Condition()
+
+    def acquire(self, blocking: bool = True) -> Any:
+        deadline = time.monotonic() + self.timeout
+        with self._lock:
+            while True:
+                if self.closed:
+                    raise PoolTimeout("Connection pool is closed")
+                self._reap()
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self._in_use < self.max_size:
+                    conn = None
+                    self._in_use += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if not blocking or remaining <= 0:
+                    raise PoolTimeout(
+                        f"No free connection after {self.timeout}s (pool size {self.max_size})"
+                    )
+                self._lock.wait(remaining)
+
+        try:
+            if conn is not None:
+                if time.monotonic() - last_used < self.check_after or self._healthy(conn):
+                    self.hits += 1
+                    return conn
+                self.discarded += 1
+                self._close(conn)
+            self.misses += 1
+            return self.factory()
+        except BaseException:
+            with self._lock:
+                self._in_use -= 1
+                self._lock.notify()
+            raise
+
+    def release(self, conn: Any, discard: bool = False) -> None:
+        with self._lock:
+            self._in_use -= 1
+            if discard or self.closed:
+                self.discarded += 1
+                self._close(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            self.release(conn, discard=not self._finish(conn.rollback))
+            raise
+        self.release(conn, discard=not self._finish(conn.commit))
+
+    def close(self) -> None:
+        with self._lock:
+            self.closed = True
+            while self._idle:
+                self._close(self._idle.pop()[0])
+            self._lock.notify_all()
+        logger.info(f"Pool closed: {self.stats()}")
+
+    def has_spare(self, reserve: int = 1) -> bool:
+        """
+        True when a connection can be leased while still leaving `reserve` free for foreground work.
+        """
+        with self._lock:
+            return not self.closed and self.max_size - self._in_use > reserve
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "discarded": self.discarded,
+            "idle": len(self._idle),
+            "in_use": self._in_use,
+            "max_size": self.max_size,
+        }
+
+    def _reap(self) -> None:
+        now = time.monotonic()
+        while self._idle and now - self._idle[0][1] > self.max_idle:
+            self.discarded += 1
+            self._close(self._idle.popleft()[0])
+
+    def _healthy(self, conn: Any) -> bool:
+        if self.check is None:
+            return True
+        try:
+            return self.check(conn)
+        except Exception as e:
+            logger.info(f"Health check failed: {repr(e)}")
+            return False
+
+    def _finish(self, action: Callable[[], None]) -> bool:
+        try:
+            action()
+            return True
+        except Exception as e:
+            logger.error(f"Error: {repr(e)}")
+            return False
+
+    def _close(self, conn: Any) -> None:
+        try:
+            conn.close()
+        except Exception as e:
+            logger.error(f"Error: {repr(e)}")
@@ -1,3 +1,4 @@
+import itertools
 import logging
 from string import Template
 
@@ -5,6 +6,7 @@ import psycopg
 
 from connectors.connector import Connector, ConnectorType, ExecutionStatus
 from connectors.exceptions import NewConnectionError
+from connectors.pool import ConnectionPool
 from util.model import Column, Schema, Table
 
 logger = logging.getLogger(__name__)
@@ -18,24 +20,66 @@ class PostgreSqlConnector(Connector):
     VIEWS_QUERY = Template(
         "SELECT TABLE_NAME AS NAME FROM INFORMATION_SCHEMA.\"tables\" WHERE TABLE_SCHEMA = '$schema' and TABLE_TYPE='VIEW';"
     )
-    COLUMNS_QUERY = Template(
-        "SELECT COLUMN_NAME AS NAME, DATA_TYPE AS TYPE FROM INFORMATION_SCHEMA.\"columns\" WHERE TABLE_SCHEMA='$schema' AND TABLE_NAME ='$table';"
-    )
     COLUMNS_QUERY = Template("""
-        SELECT COLUMN_NAME AS NAME, DATA_TYPE AS TYPE
-            , CASE WHEN IS_NULLABLE = 'YES' THEN 0 ELSE 1 END AS NOT_NULL
-            , (SELECT INDISPRIMARY FROM PG_INDEX WHERE INDRELID = '$table'::REGCLASS) AS PK
-            , COLUMN_DEFAULT AS DEFAULT_VALUE
-        FROM INFORMATION_SCHEMA."columns"
-        WHERE TABLE_SCHEMA='$schema'
-            AND TABLE_NAME ='$table';
+        SELECT A.ATTNAME AS NAME
+            , FORMAT_TYPE(A.ATTTYPID, A.ATTTYPMOD) AS TYPE
+            , A.ATTNOTNULL AS NOT_NULL
+            , P.CONRELID IS NOT NULL AS PK
+            , PG_GET_EXPR(D.ADBIN, D.ADRELID) AS DEFAULT_VALUE
+        FROM PG_CATALOG.PG_CLASS C
+        JOIN PG_CATALOG.PG_NAMESPACE N ON N.OID = C.RELNAMESPACE
+        JOIN PG_CATALOG.PG_ATTRIBUTE A ON A.ATTRELID = C.OID AND A.ATTNUM > 0 AND NOT A.ATTISDROPPED
+        LEFT JOIN PG_CATALOG.PG_CONSTRAINT P ON P.CONRELID = C.OID AND P.CONTYPE = 'p' AND A.ATTNUM = ANY(P.CONKEY)
+        LEFT JOIN PG_CATALOG.PG_ATTRDEF D ON D.ADRELID = C.OID AND D.ADNUM = A.ATTNUM
+        WHERE N.NSPNAME = '$schema'
+            AND C.RELNAME = '$table'
+        ORDER BY A.ATTNUM;
+        """)
+
+    SNAPSHOT_QUERY = Template("""
+        SELECT N.NSPNAME, C.RELNAME
+            , CASE WHEN C.RELKIND = 'v' THEN 'view' ELSE 'table' END AS KIND
+            , A.ATTNAME, FORMAT_TYPE(A.ATTTYPID, A.ATTTYPMOD) AS TYPE, A.ATTNOTNULL AS NOT_NULL
+            , P.CONRELID IS NOT NULL AS PK
+            , PG_GET_EXPR(D.ADBIN, D.ADRELID) AS DEFAULT_VALUE
+        FROM PG_CATALOG.PG_CLASS C
+        JOIN PG_CATALOG.PG_NAMESPACE N ON N.OID = C.RELNAMESPACE
+        LEFT JOIN PG_CATALOG.PG_ATTRIBUTE A ON A.ATTRELID = C.OID AND A.ATTNUM > 0 AND NOT A.ATTISDROPPED
+        LEFT JOIN PG_CATALOG.PG_CONSTRAINT P ON P.CONRELID = C.OID AND P.CONTYPE = 'p' AND A.ATTNUM = ANY(P.CONKEY)
+        LEFT JOIN PG_CATALOG.PG_ATTRDEF D ON D.ADRELID = C.OID AND D.ADNUM = A.ATTNUM
+        WHERE C.RELKIND IN ('r', 'p', 'v')
+            AND $filter
+        ORDER BY N.NSPNAME, C.RELNAME, A.ATTNUM;
         """)
+    SNAPSHOT_SCHEMA_FILTER = Template("N.NSPNAME = '$schema'")
+    SNAPSHOT_DATABASE_FILTER = "N.NSPNAME IN (SELECT SCHEMA_NAME FROM INFORMATION_SCHEMA.SCHEMATA WHERE SCHEMA_OWNER='pg_database_owner')"
+
+    FINGERPRINTS_QUERY = """
+        SELECT N.NSPNAME
+            , COUNT(C.OID) || ':' || COALESCE(SUM(C.OID::BIGINT), 0)
+                || ':' || COALESCE(MAX(C.XMIN::TEXT::BIGINT), 0)
+                || ':' || COALESCE(MAX(A.XMIN), 0) AS FINGERPRINT
+        FROM PG_CATALOG.PG_NAMESPACE N
+        LEFT JOIN PG_CATALOG.PG_CLASS C ON C.RELNAMESPACE = N.OID AND C.RELKIND IN ('r', 'p', 'v')
+        LEFT JOIN (
+            SELECT ATTRELID, MAX(XMIN::TEXT::BIGINT) AS XMIN
+            FROM PG_CATALOG.PG_ATTRIBUTE
+            WHERE ATTNUM > 0
+            GROUP BY ATTRELID
+        ) A ON A.ATTRELID = C.OID
+        WHERE N.NSPNAME IN (SELECT SCHEMA_NAME FROM INFORMATION_SCHEMA.SCHEMATA WHERE SCHEMA_OWNER='pg_database_owner')
+        GROUP BY N.NSPNAME;
+        """
 
     PREVIEW_QUERY = Template("""SELECT * FROM $schema.$table LIMIT 10;
     """)
 
+    POOL_MAX_SIZE = 4
+    POOL_MAX_IDLE = 300.0
+
     def __init__(self, database: str, host: str, port: int, user: str, passw: str):
         super().__init__(database, host, port, user, passw, ConnectorType.POSTGRESQL)
+        self.cursor_ids = itertools.count()
 
     def test(self) -> None:
         try:
@@ -47,6 +91,56 @@ class PostgreSqlConnector(Connector):
     def connection_string(self) -> str:
         return f"dbname={self.database} host={self.host} port={self.port} user={self.user} password={self.passw}"
 
+    def connect(self) -> psycopg.Connection:
+        return psycopg.connect(self.connection_string())
+
+    def check_connection(self, conn: psycopg.Connection) -> bool:
+        if conn.closed or conn.broken:
+            return False
+        conn.execute("SELECT 1")
+        conn.rollback()
+        return True
+
+    def open_cursor(
+        self, conn: psycopg.Connection, server_side: bool = False, scrollable: bool = True
+    ):
+        if server_side:
+            return conn.cursor(
+                name=f"siquel_{next(self.cursor_ids)}", scrollable=scrollable
+            )
+        return conn.cursor()
+
+    def scroll(self, cursor: psycopg.ServerCursor, position: int) -> bool:
+        cursor.scroll(position, mode="absolute")
+        return True
+
+    def estimate_rows(self, conn: psycopg.Connection, query: str) -> int | None:
+        try:
+            with conn.transaction():
+                with conn.cursor() as cur:
+                    cur.execute(f"EXPLAIN (FORMAT JSON) {query}")
+                    return int(cur.fetchone()[0][0]["Plan"]["Plan Rows"])
+        except Exception as e:
+            logger.info(f"Estimate failed: {repr(e)}")
+            return None
+
+    def autocommit(self, conn: psycopg.Connection, on: bool) -> None:
+        conn.autocommit = on
+
+    def in_transaction(self, conn: psycopg.Connection) -> bool:
+        return conn.info.transaction_status != psycopg.pq.TransactionStatus.IDLE
+
+    def interrupt(self, conn: psycopg.Connection) -> None:
+        conn.cancel()
+
+    def create_pool(self) -> ConnectionPool:
+        return ConnectionPool(
+            self.connect,
+            self.check_connection,
+            max_size=self.POOL_MAX_SIZE,
+            max_idle=self.POOL_MAX_IDLE,
+        )
+
     def get_schemas(self) -> list[Schema]:
         results = self.query(self.SCHEMAS_QUERY)
         schemas = list()
@@ -79,11 +173,23 @@ class PostgreSqlConnector(Connector):
             columns.append(Column(val[0], val[1], bool(val[2]), bool(val[3]), val[4]))
         return columns
 
+    def get_snapshot(self, schema: str | None) -> list[tuple]:
+        filter: str = (
+            self.SNAPSHOT_DATABASE_FILTER
+            if schema is None
+            else self.SNAPSHOT_SCHEMA_FILTER.substitute(schema=schema)
+        )
+        return self.query(self.SNAPSHOT_QUERY.substitute(filter=filter))
+
+    def get_fingerprints(self) -> dict[str, str]:
+        with self.pool.connection() as conn:
+            return dict(conn.execute(self.FINGERPRINTS_QUERY).fetchall())
+
     def preview_query(self, schema: str, table: str) -> str:
         return self.PREVIEW_QUERY.substitute(schema=schema, table=table)
 
     def execute(self, query: str) -> (ExecutionStatus, str):
-        with psycopg.connect(self.connection_string()) as conn:
+        with self.pool.connection() as conn:
             with conn.cursor() as cur:
                 try:
                     cur.execute(query)
@@ -93,7 +199,7 @@ class PostgreSqlConnector(Connector):
                     return (ExecutionStatus.Failure, repr(e))
 
     def query(self, query: str) -> [()]:
-        with psycopg.connect(self.connection_string()) as conn:
+        with self.pool.connection() as conn:
             with conn.cursor() as cur:
                 try:
                     cur.execute(query)
@@ -101,16 +207,3 @@ class PostgreSqlConnector(Connector):
                 except Exception as e:
                     logger.error(f"Error: {repr(e)}")
                     return [("error", repr(e))]
-
-    def query_with_names(self, query: str) -> [()]:
-        with psycopg.connect(self.connection_string()) as conn:
-            with conn.cursor() as cur:
-                try:
-                    cur.execute(query)
-                    names = tuple(list(map(lambda x: x[0], cur.description)))
-                    rows = cur.fetchall()
-                    rows.insert(0, names)
-                    return rows
-                except Exception as e:
-                    logger.error(f"Error: {repr(e)}")
-                    return [("error", repr(e))]
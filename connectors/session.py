@@ -0,0 +1,155 @@
+import logging
+from typing import Any, Iterator
+
+from connectors.exceptions import QueryCancelled
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCursor:
+    """
+    Cursor over the results of a single statement
+    """
+
+    BATCH_SIZE = 1000
+
+    def __init__(
+        self, session: "Session", query: str, server_side: bool = False, scrollable: bool = True
+    ):
+        self.session = session
+        self.query = query
+        self.server_side = server_side
+        self.scrollable = scrollable
+        self.fetched = 0
+        self.position = 0
+        self.cursor = session.connector.open_cursor(session.conn, server_side, scrollable)
+        session.check_cancelled()
+        self.cursor.execute(query)
+        self.names: tuple | None = (
+            None
+            if self.cursor.description is None
+            else tuple(map(lambda x: x[0], self.cursor.description))
+        )
+        self.rowcount: int = self.cursor.rowcount
+        self.exhausted = self.names is None
+
+    def fetch(self, size: int = BATCH_SIZE) -> list[tuple]:
+        if self.exhausted:
+            return []
+        self.session.check_cancelled()
+        rows = self.cursor.fetchmany(size)
+        self.fetched += len(rows)
+        self.position += len(rows)
+        if len(rows) < size:
+            self.exhausted = True
+        return rows
+
+    def seek(self, position: int) -> None:
+        """
+        Moves to an absolute row position, re-running the query if the cursor cannot scroll
+        there. A cursor opened without scrolling only moves forward.
+        """
+        self.session.check_cancelled()
+        forward: bool = self.scrollable or position >= self.position
+        if not (forward and self.session.connector.scroll(self.cursor, position)):
+            self.cursor.close()
+            self.cursor = self.session.connector.open_cursor(
+                self.session.conn, self.server_side, self.scrollable
+            )
+            self.cursor.execute(self.query)
+            self.position = 0
+            while self.position < position:
+                skipped = self.cursor.fetchmany(min(self.BATCH_SIZE, position - self.position))
+                if len(skipped) == 0:
+                    break
+                self.position += len(skipped)
+        self.position = position
+        self.exhausted = self.names is None
+
+    def batches(self, size: int = BATCH_SIZE) -> Iterator[list[tuple]]:
+        while not self.exhausted:
+            rows = self.fetch(size)
+            if len(rows) != 0:
+                yield rows
+
+    def close(self) -> None:
+        try:
+            self.cursor.close()
+        except Exception as e:
+            logger.error(f"Error: {repr(e)}")
+
+
+class Session:
+    """
+    Pooled connection leased for one user request, cancellable from another thread.
+    A read-only session always rolls back when it closes.
+    """
+
+    def __init__(self, connector, read_only: bool = False):
+        self.connector = connector
+        self.read_only = read_only
+        self.autocommit = False
+        self.pool = connector.pool
+        self.conn: Any = self.pool.acquire()
+        self.cursor: ResultCursor = None
+        self.cancelled = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close(commit=exc_type is None and not self.cancelled and not self.read_only)
+
+    def execute(
+        self, query: str, server_side: bool = False, scrollable: bool = True
+    ) -> ResultCursor:
+        if self.cursor is not None:
+            self.cursor.close()
+        self.cursor = ResultCursor(self, query, server_side, scrollable)
+        return self.cursor
+
+    def begin(self) -> None:
+        self.connector.begin(self.conn)
+
+    def set_autocommit(self) -> None:
+        """
+        Leaves transaction control to the statements. Whatever they leave open is rolled back
+        when the session closes.
+        """
+        self.connector.autocommit(self.conn, True)
+        self.autocommit = True
+
+    def in_transaction(self) -> bool:
+        return self.connector.in_transaction(self.conn)
+
+    def estimate(self, query: str) -> int | None:
+        return self.connector.estimate_rows(self.conn, query)
+
+    def check_cancelled(self) -> None:
+        if self.cancelled:
+            raise QueryCancelled("Query cancelled")
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        try:
+            self.connector.interrupt(self.conn)
+        except Exception as e:
+            logger.error(f"Error: {repr(e)}")
+
+    def fetched(self) -> int:
+        return 0 if self.cursor is None else self.cursor.fetched
+
+    def close(self, commit: bool = True) -> None:
+        if self.cursor is not None:
+            self.cursor.close()
+        try:
+            if commit and not self.autocommit:
+                self.conn.commit()
+            else:
+                self.conn.rollback()
+            if self.autocommit:
+                self.connector.autocommit(self.conn, False)
+            self.pool.release(self.conn)
+        except Exception as e:
+            logger.error(f"Error: {repr(e)}")
+            self.pool.release(self.conn, discard=True)
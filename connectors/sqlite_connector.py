@@ -4,6 +4,7 @@ from sqlite3 import OperationalError
 from string import Template
 
 from connectors.connector import Connector, ConnectorType, ExecutionStatus
+from connectors.pool import ConnectionPool
 from util.model import Column, Schema, Table
 from util.crypto import decrypt
 
@@ -28,11 +29,29 @@ class SqliteConnector(Connector):
         """
     )
 
+    SNAPSHOT_QUERY = """SELECT M.NAME, M.TYPE, P.NAME, P.TYPE, P."notnull", P.PK, P.DFLT_VALUE
+        FROM SQLITE_MASTER M
+        LEFT JOIN PRAGMA_TABLE_XINFO(M.NAME) P ON P.HIDDEN <> 1
+        WHERE M.TYPE IN ('table', 'view')
+            AND M.NAME NOT LIKE 'sqlite_%'
+        ORDER BY M.NAME, P.CID;
+        """
+
     PREVIEW_QUERY = Template("""SELECT * FROM $table LIMIT 10;
     """)
 
-    def __init__(self, database):
+    # per-connection only; journal_mode=WAL converts the database file for good, so it
+    # stays opt-in through the "pragmas" connection option
+    DEFAULT_PRAGMAS = {
+        "cache_size": -64000,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+    }
+    POOL_MAX_SIZE = 4
+
+    def __init__(self, database, pragmas: dict[str, any] = None):
         super().__init__(database, None, None, None, None, ConnectorType.SQLITE)
+        self.pragmas = {**self.DEFAULT_PRAGMAS, **(pragmas or {})}
 
     def test(self) -> None:
         with sqlite3.connect(self.connection_string()) as conn:
@@ -41,6 +60,34 @@ class SqliteConnector(Connector):
     def connection_string(self) -> str:
         return f"{self.database}.db"
 
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.connection_string(), check_same_thread=False)
+        for key, value in self.pragmas.items():
+            if not key.isidentifier():
+                logger.error(f"Skipping invalid pragma: {key}")
+                continue
+            conn.execute(f"PRAGMA {key}={value}")
+        return conn
+
+    def interrupt(self, conn: sqlite3.Connection) -> None:
+        conn.interrupt()
+
+    def begin(self, conn: sqlite3.Connection) -> None:
+        # the driver only opens transactions implicitly before DML
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+
+    def autocommit(self, conn: sqlite3.Connection, on: bool) -> None:
+        conn.isolation_level = None if on else ""
+
+    def in_transaction(self, conn: sqlite3.Connection) -> bool:
+        return conn.in_transaction
+
+    def create_pool(self) -> ConnectionPool:
+        return ConnectionPool(
+            self.connect, max_size=self.POOL_MAX_SIZE, max_idle=float("inf")
+        )
+
     def get_schemas(self) -> list[Schema]:
         schemas = list()
         schemas.append(Schema(self.database, None, None))
@@ -68,11 +115,20 @@ class SqliteConnector(Connector):
             columns.append(Column(val[0], val[1], bool(val[2]), bool(val[3]), val[4]))
         return columns
 
+    def get_snapshot(self, schema: str | None) -> list[tuple]:
+        results = self.query(self.SNAPSHOT_QUERY)
+        return list(map(lambda val: (self.database, *val), results))
+
+    def get_fingerprints(self) -> dict[str, str]:
+        with self.pool.connection() as conn:
+            version = conn.execute("PRAGMA SCHEMA_VERSION;").fetchone()[0]
+        return {self.database: str(version)}
+
     def preview_query(self, schema: str, table: str) -> str:
         return self.PREVIEW_QUERY.substitute(schema=schema, table=table)
 
     def execute(self, query: str) -> (ExecutionStatus, str):
-        with sqlite3.connect(self.connection_string()) as conn:
+        with self.pool.connection() as conn:
             try:
                 cursor = conn.cursor()
                 cursor.execute(query)
@@ -82,7 +138,7 @@ class SqliteConnector(Connector):
                 return (ExecutionStatus.Failure, repr(e))
 
     def query(self, query: str) -> [()]:
-        with sqlite3.connect(self.connection_string()) as conn:
+        with self.pool.connection() as conn:
             try:
                 cursor = conn.cursor()
                 cursor.execute(query)
@@ -90,19 +146,3 @@ class SqliteConnector(Connector):
             except OperationalError as e:
                 logger.error(f"Error: {repr(e)}")
                 return [("error", repr(e))]
-
-    def query_with_names(self, query: str) -> [()]:
-        with sqlite3.connect(self.connection_string()) as conn:
-            try:
-                cursor = conn.cursor()
-                try:
-                    cursor.execute(query)
-                    names = tuple(list(map(lambda x: x[0], cursor.description)))
-                except TypeError:
-                    names = tuple([])
-                rows = cursor.fetchall()
-                rows.insert(0, names)
-                return rows
-            except Exception as e:
-                logger.error(f"Error: {repr(e)}")
-                return [("error", repr(e))]
@@ -1,10 +1,15 @@
+from util.profiler import PROFILER  # first import, starts the startup clock
+
+import argparse
 import logging
+from functools import partial
+from typing import Callable
 
-from cryptography.fernet import InvalidToken
 from textual.app import App, ComposeResult
 from textual.containers import Horizontal, Vertical
 from textual.dom import NoMatches
 from textual.reactive import reactive
+from textual.timer import Timer
 from textual.widget import Widget
 from textual.widgets import (
     Footer,
@@ -15,15 +20,22 @@ from textual.widgets import (
     TextArea,
     Tree,
 )
+from textual.widgets._tree import TreeNode
+from textual.worker import get_current_worker
 
 import util.bindings as B
 import util.conn_file as F
 from components.menu import Menu
 from components.screens.edit_connection import EditConnectionScreen
+from components.screens.export_screen import ExportScreen
 from components.screens.new_connection import NewConnectionScreen
 from components.screens.quit_screen import QuitScreen
+from components.screens.search_screen import SearchScreen
 from connection.connection import Connection
+from connectors.exceptions import CredentialsError, ExportError
+from connectors.metadata_cache import METADATA_CACHE
 from util.crypto import load_env
+from util.model import ExportFormat, NodeData
 
 logger = logging.getLogger(__name__)
 
@@ -46,12 +58,12 @@ class SiquelClient(App):
 
     def __init__(self):
         super().__init__()
-        try:
-            self.connections = F.read_conn_file()
-        except InvalidToken:
-            self.connections = []
+        METADATA_CACHE.configure()
+        self.connections = F.read_conn_file()
+        PROFILER.mark("conn file")
 
     menu: Menu
+    revealing: list[NodeData] = None
 
     def compose(self) -> ComposeResult:
         with Vertical():
@@ -60,6 +72,7 @@ class SiquelClient(App):
             with Horizontal():
                 with Vertical(classes="box column1", id="menu-container"):
                     self.menu = Menu(self.connections)
+                    PROFILER.mark("tree render")
                     yield self.menu.tree
                 with TabbedContent(classes="box column4"):
                     with TabPane("Initial", id="initial"):
@@ -70,30 +83,88 @@ class SiquelClient(App):
                 yield Footer()
 
     def on_tree_node_expanded(self, event: Tree.NodeExpanded) -> None:
-        label: str = event.node.label.plain
-        if label.startswith("["):
-            # try:
-            self.menu.fill_child_nodes(event)
+        if event.node.data is not None:
             conn: Connection = self.menu.get_connection_by_node(event.node)
             if conn:
-                print(conn)
                 logger.info(conn)
                 self.add_connection_tab(conn)
-            # except Exception as e:
-            #     self.app.action_notify(
-            #         f"{e}", title=f"{e.__class__.__name__}", severity="error"
-            #     )
-            #     event.node.collapse()
+            work = self.menu.fill_child_nodes(event)
+            if work is None:
+                self.node_filled(event.node, conn)
+            else:
+                worker = self.run_worker(
+                    partial(self.load_child_nodes, event.node, conn, *work),
+                    group=f"expand-{event.node.id}",
+                    exclusive=True,
+                    exit_on_error=False,
+                    thread=True,
+                )
+                if conn:
+                    conn.track(worker)
+
+    def on_tree_node_collapsed(self, event: Tree.NodeCollapsed) -> None:
+        self.workers.cancel_group(self, f"expand-{event.node.id}")
+        if self.menu.is_loading(event.node):
+            event.node.remove_children()
+
+    def load_child_nodes(
+        self,
+        node: TreeNode,
+        conn: Connection,
+        load: Callable[[], list],
+        fill: Callable[[list], None],
+    ) -> None:
+        """
+        Runs the catalog query of an expanded node. Blocking, meant for a worker thread.
+        """
+        worker = get_current_worker()
+        if worker.is_cancelled:
+            return
+        try:
+            items = load()
+        except Exception as e:
+            logger.error(f"Error: {repr(e)}")
+            if not worker.is_cancelled:
+                self.call_from_thread(self.node_failed, node, e)
+            return
+        if not worker.is_cancelled:
+            self.call_from_thread(fill, items)
+            self.call_from_thread(self.node_filled, node, conn)
 
-    def get_connection_by_id(self, name: str) -> Connection:
-        for connection in self.connections:
-            if self.strip_decorator(name) == connection.id:
-                return connection
+    def node_filled(self, node: TreeNode, conn: Connection) -> None:
+        if conn is None:
+            return
+        if conn.connected and not conn.validated:
+            conn.validated = True
+            conn.track(
+                self.run_worker(conn.revalidate_metadata, group="metadata", thread=True)
+            )
+        targets = self.menu.prefetch_targets(node, self.menu.tree.size.height)
+        if targets is not None:
+            self.call_after_refresh(self.prefetch_metadata, conn, targets)
+        if self.revealing is not None:
+            self.reveal_next()
+
+    def node_failed(self, node: TreeNode, e: Exception) -> None:
+        self.revealing = None
+        if self.menu.is_loading(node):
+            node.remove_children()
+        node.collapse()
+        self.app.action_notify(f"{e}", title=f"{e.__class__.__name__}", severity="error")
+
+    def prefetch_metadata(self, connection: Connection, targets: tuple) -> None:
+        connection.track(
+            self.run_worker(
+                partial(connection.prefetch, *targets),
+                group="prefetch",
+                exclusive=True,
+                exit_on_error=False,
+                thread=True,
+            )
+        )
 
-    def strip_decorator(self, name: str) -> str:
-        if name is None or not name.startswith("["):
-            return name
-        return name.split(" ")[1]
+    def get_connection_by_id(self, uid: str) -> Connection | None:
+        return self.menu.get_connection_by_id(uid)
 
     def input_area(self) -> TextArea:
         return TextArea.code_editor("SELECT * FROM DUAL;", language="sql")
@@ -110,7 +181,7 @@ class SiquelClient(App):
             )
             input.add_class(connection.conn.env.name.lower())
             results: Horizontal = Horizontal(
-                connection.results, classes="half_height", id="results"
+                connection.output, classes="half_height", id="results"
             )
             results.add_class(connection.conn.env.name.lower())
 
@@ -126,6 +197,17 @@ class SiquelClient(App):
     def on_mount(self) -> None:
         self.title = "Header Application"
         self.sub_title = "With title and sub-title"
+        self.call_after_refresh(self.first_paint)
+
+    def first_paint(self) -> None:
+        PROFILER.mark("first paint")
+        if PROFILER.enabled:
+            self.exit()
+
+    def on_unmount(self) -> None:
+        for connection in self.connections:
+            connection.close()
+        logger.info(f"Metadata cache: {METADATA_CACHE.stats()}")
 
     def action_clear_input(self) -> None:
         active_pane = self.app.query_one(TabbedContent).active_pane.id
@@ -133,8 +215,7 @@ class SiquelClient(App):
             return
         conn: Connection = self.get_connection_by_id(active_pane)
         conn.input.clear()
-        conn.results.clear()
-        conn.results.columns.clear()
+        conn.clear_results()
 
     def action_format_query(self) -> None:
         active_pane = self.app.query_one(TabbedContent).active_pane.id
@@ -147,16 +228,215 @@ class SiquelClient(App):
         tabbed_content: TabbedContent = self.app.query_one(TabbedContent)
         if tabbed_content.active_pane.id == "initial":
             return
-        self.get_connection_by_id(tabbed_content.active_pane.id).exec_query()
+        self.exec_query(self.get_connection_by_id(tabbed_content.active_pane.id))
+
+    def action_exec_statement(self) -> None:
+        tabbed_content: TabbedContent = self.app.query_one(TabbedContent)
+        if tabbed_content.active_pane.id == "initial":
+            return
+        connection: Connection = self.get_connection_by_id(tabbed_content.active_pane.id)
+        self.exec_query(connection, connection.current_statement())
+
+    def action_cancel_query(self) -> None:
+        active_pane = self.app.query_one(TabbedContent).active_pane.id
+        if active_pane == "initial":
+            return
+        connection: Connection = self.get_connection_by_id(active_pane)
+        if connection.cancel():
+            return
+        rows: int | None = connection.stop_paging()
+        if rows is None:
+            self.app.action_notify("No query is running", "Cancel")
+        else:
+            self.app.action_notify(f"Stopped after {rows:,} rows", "Cancel")
+
+    def action_fetch_more(self) -> None:
+        active_pane = self.app.query_one(TabbedContent).active_pane.id
+        if active_pane == "initial":
+            return
+        if not self.get_connection_by_id(active_pane).fetch_more():
+            self.app.action_notify("No more rows to fetch", "Fetch")
+
+    def action_fetch_all(self) -> None:
+        active_pane = self.app.query_one(TabbedContent).active_pane.id
+        if active_pane == "initial":
+            return
+        if not self.get_connection_by_id(active_pane).fetch_all():
+            self.app.action_notify("No more rows to fetch", "Fetch")
+
+    def action_close_tab(self) -> None:
+        tabbed_content: TabbedContent = self.app.query_one(TabbedContent)
+        active_pane = tabbed_content.active_pane.id
+        if active_pane == "initial":
+            return
+        connection: Connection = self.get_connection_by_id(active_pane)
+        tabbed_content.remove_pane(active_pane)
+        connection.release()
+
+    def action_export_results(self) -> None:
+        active_pane = self.app.query_one(TabbedContent).active_pane.id
+        if active_pane == "initial":
+            return
+        connection: Connection = self.get_connection_by_id(active_pane)
+        if connection.exporting:
+            self.app.action_notify(
+                f"{connection.conn.id} is still exporting", "Busy", "warning"
+            )
+            return
+        query: str = connection.last_query or connection.input.text
+        if len(query.strip()) == 0:
+            return
+        try:
+            query = connection.export_query(query)
+        except ExportError as e:
+            self.app.action_notify(f"{e}", "Export", "warning")
+            return
+
+        def result(target: tuple[str, ExportFormat] | None):
+            if target:
+                self.export_results(connection, query, *target)
+
+        self.push_screen(ExportScreen(connection.conn.id), result)
+
+    def export_results(
+        self, connection: Connection, query: str, path: str, format: ExportFormat
+    ) -> None:
+        connection.exporting = True
+        connection.exported = 0
+        timer: Timer = self.set_interval(
+            0.2, lambda: self.update_exporting(connection, timer)
+        )
+        connection.track(
+            self.run_worker(
+                partial(self.run_export, connection, query, path, format),
+                group=f"export-{connection.id}",
+                exit_on_error=False,
+                thread=True,
+            )
+        )
+
+    def run_export(
+        self, connection: Connection, query: str, path: str, format: ExportFormat
+    ) -> None:
+        """
+        Runs the export of a connection. Blocking, meant for a worker thread.
+        """
+        try:
+            rows: int = connection.export(query, path, format)
+            self.call_from_thread(
+                self.app.action_notify, f"Exported {rows:,} rows to {path}", "Export"
+            )
+        except Exception as e:
+            logger.error(f"Error: {repr(e)}")
+            self.call_from_thread(
+                self.app.action_notify, f"{e}", f"{e.__class__.__name__}", "error"
+            )
+
+    def update_exporting(self, connection: Connection, timer: Timer) -> None:
+        if not connection.exporting:
+            timer.stop()
+        self.update_tab_label(connection)
+
+    def exec_query(self, connection: Connection, query: str = None) -> None:
+        if connection.running:
+            self.app.action_notify(
+                f"{connection.conn.id} is still running", "Busy", "warning"
+            )
+            return
+        if query is None:
+            query = connection.input.text
+        if len(query.strip()) == 0:
+            return
+        connection.close_results()
+        connection.start()
+        timer: Timer = self.set_interval(
+            0.1, lambda: self.update_running(connection, timer)
+        )
+        connection.track(
+            self.run_worker(
+                partial(connection.exec_query, query, self.call_from_thread),
+                group=connection.id,
+                exit_on_error=False,
+                thread=True,
+            )
+        )
+
+    def update_running(self, connection: Connection, timer: Timer) -> None:
+        if not connection.running:
+            timer.stop()
+        self.update_tab_label(connection)
+
+    def update_tab_label(self, connection: Connection) -> None:
+        try:
+            tab = self.app.query_one(TabbedContent).get_tab(connection.id)
+        except NoMatches:
+            return
+        if connection.running:
+            label = f"{connection.conn.display_name()} [yellow1]● {connection.elapsed():.1f}s[/]"
+        else:
+            label = f"{connection.conn.display_name()} [dim]{connection.elapsed():.1f}s[/]"
+        if connection.exporting:
+            label += f" [turquoise2]⇩ {connection.exported:,}[/]"
+        tab.label = label
 
     def action_preview_data(self) -> None:
-        self.menu.preview_data()
+        connection: Connection = self.menu.preview_data()
+        if connection:
+            self.add_connection_tab(connection)
+            self.exec_query(connection)
 
     def action_refresh_connection(self) -> None:
-        self.menu.refresh_connection()
+        node: TreeNode = self.menu.refresh_connection()
+        if node is not None:
+            self.reload_node(node)
 
     def action_refresh_parent(self) -> None:
-        self.menu.refresh_parent()
+        node: TreeNode = self.menu.refresh_parent()
+        if node is not None:
+            self.reload_node(node)
+
+    def reload_node(self, node: TreeNode) -> None:
+        """
+        Re-introspects an expanded subtree and patches the changed nodes in place.
+        Collapsed subtrees are dropped and load again when expanded.
+        """
+        if not node.is_expanded:
+            node.remove_children()
+            return
+        if self.menu.is_loading(node):
+            return
+        work = self.menu.loader(node)
+        if work is None:
+            self.reload_children(node)
+            return
+        load, specs = work
+        worker = self.run_worker(
+            partial(
+                self.load_child_nodes,
+                node,
+                None,
+                load,
+                partial(self.node_reloaded, node, specs),
+            ),
+            group=f"expand-{node.id}",
+            exclusive=True,
+            exit_on_error=False,
+            thread=True,
+        )
+        connection: Connection = self.menu.get_connection_by_node(node)
+        if connection:
+            connection.track(worker)
+
+    def node_reloaded(
+        self, node: TreeNode, specs: Callable[[TreeNode, list], list[tuple]], items: list
+    ) -> None:
+        self.menu.patch_children(node, specs(node, items))
+        self.reload_children(node)
+
+    def reload_children(self, node: TreeNode) -> None:
+        for child in node.children:
+            if self.menu.reloadable(child):
+                self.reload_node(child)
 
     def action_request_quit(self) -> None:
         self.push_screen(QuitScreen())
@@ -176,6 +456,11 @@ class SiquelClient(App):
     def action_edit_connection(self) -> None:
         connection: Connection = self.menu.get_selected_connection()
         if connection:
+            try:
+                connection.conn.unseal()
+            except CredentialsError as e:
+                self.app.action_notify(f"{e}", "Edit", "error")
+                return
             existing_connections: [(str, str)] = list(
                 map(lambda c: tuple([c.conn.env.name, c.conn.id]), self.connections)
             )
@@ -192,8 +477,47 @@ class SiquelClient(App):
             )
 
     def action_save_connections(self) -> None:
-        F.write_conn_file(self.connections)
-        self.app.action_notify(f"Saved {len(self.connections)} connections", "Saved")
+        changed: int = F.write_conn_file(self.connections)
+        if changed == 0:
+            self.app.action_notify("No changes to save", "Saved")
+        else:
+            self.app.action_notify(
+                f"Saved {len(self.connections)} connections, {changed} changed", "Saved"
+            )
+
+    def action_search_objects(self) -> None:
+        def result(target: tuple[str, tuple] | None):
+            if target:
+                self.reveal(*target)
+
+        self.push_screen(SearchScreen(self.connections), result)
+
+    def reveal(self, uid: str, path: tuple) -> None:
+        self.revealing = self.menu.node_path(uid, *path)
+        self.reveal_next()
+
+    def reveal_next(self) -> None:
+        """
+        Walks the tree down to the node being revealed, expanding the nodes on the way.
+        Picked up again by `node_filled` whenever a node has to load its children first.
+        """
+        tree: Tree = self.menu.tree
+        node: TreeNode = tree.root
+        for depth, data in enumerate(self.revealing):
+            child: TreeNode = next((c for c in node.children if c.data == data), None)
+            if child is None:
+                if not self.menu.is_loading(node):
+                    self.revealing = None
+                    self.app.action_notify("Object no longer exists", "Search", "warning")
+                return
+            node = child
+            if depth < len(self.revealing) - 1 and not node.is_expanded:
+                node.expand()
+                return
+        self.revealing = None
+        tree.move_cursor(node)
+        tree.scroll_to_node(node)
+        tree.focus()
 
     def action_tree_left(self) -> None:
         self.menu.tree.action_cursor_parent()
@@ -215,12 +539,25 @@ class SiquelClient(App):
             return None
 
     def update_connection(self, idx: int, connection: Connection) -> None:
+        self.connections[idx].close()
+        self.connections[idx].forget_metadata()
         self.connections[idx].conn = connection.conn
-        self.connections[idx].conn.connector().clear()
-        self.menu.refresh_tree(self.connections)
+        self.connections[idx].connector = connection.connector
+        self.menu.update_connection_node(self.connections[idx])
 
 
 if __name__ == "__main__":
+    PROFILER.mark("imports")
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="exit after the first paint and print a startup timing breakdown",
+    )
+    PROFILER.enabled = parser.parse_args().profile_startup
     load_env()
+    PROFILER.mark("env load")
     app = SiquelClient()
     app.run()
+    if PROFILER.enabled:
+        print(PROFILER.report())
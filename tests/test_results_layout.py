@@ -0,0 +1,67 @@
+import asyncio
+import json
+import sqlite3
+
+from cryptography.fernet import Fernet
+
+from connection.conn import Conn
+from util.model import ConnectorType, Env
+
+
+def app_in(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("F_KEY", Fernet.generate_key().decode())
+    with sqlite3.connect(tmp_path / "local.db") as db:
+        db.execute("CREATE TABLE t (id INTEGER, name TEXT)")
+        db.executemany("INSERT INTO t VALUES (?, ?)", [(i, f"row{i}") for i in range(50)])
+    conn = Conn("local", "local", None, None, None, None, ConnectorType.SQLITE, Env.DEV)
+    (tmp_path / "conn.json").write_text(json.dumps([conn.to_dict()]))
+
+    import main
+
+    return main.SiquelClient()
+
+
+async def run_query(app, pilot, query: str):
+    connection = app.connections[0]
+    app.menu.tree.root.children[0].expand()
+    await pilot.pause(0.3)
+    connection.input.text = query
+    app.action_exec_query()
+    for _ in range(100):
+        await pilot.pause(0.05)
+        if not connection.running:
+            break
+    await pilot.pause(0.2)
+    return connection
+
+
+def test_single_query_rows_visible(tmp_path, monkeypatch):
+    app = app_in(tmp_path, monkeypatch)
+
+    async def run():
+        async with app.run_test(size=(140, 40)) as pilot:
+            connection = await run_query(app, pilot, "select name from t order by id")
+            results = connection.results
+            assert results.size.height > 0
+            assert "row0" in results.render_line(1).text
+
+    asyncio.run(run())
+
+
+def test_script_rows_visible(tmp_path, monkeypatch):
+    app = app_in(tmp_path, monkeypatch)
+
+    async def run():
+        async with app.run_test(size=(140, 40)) as pilot:
+            connection = await run_query(app, pilot, "select 1 as a; select name from t")
+            summary = connection.summary
+            assert summary.size.height > 0
+            assert "select name from t" in summary.render_line(2).text
+            view = list(connection.output.query("ResultsView"))[-1]
+            connection.output.active = view.parent.id
+            await pilot.pause(0.1)
+            assert view.size.height > 0
+            assert "row0" in view.render_line(1).text
+
+    asyncio.run(run())
@@ -0,0 +1,33 @@
+from util.search import ObjectIndex
+
+NAMES = ["cusxomer", "customers", "customer_orders", "orders", "order_items", "invoices"]
+PATHS = [("public", "table", name, None) for name in NAMES] + [
+    ("public", "table", name, column)
+    for name in NAMES
+    for column in ["id", "customer_id", "created_at", "order_no"]
+]
+
+
+def index() -> ObjectIndex:
+    objects = ObjectIndex()
+    objects.add(PATHS)
+    return objects
+
+
+def typed(objects: ObjectIndex, query: str) -> list:
+    for end in range(1, len(query) + 1):
+        result = objects.search(query[:end])
+    return result
+
+
+def test_typo_tolerated_while_typing():
+    assert [path[2] for _, path in typed(index(), "cusxomers")[:3]] == [
+        "cusxomer",
+        "customers",
+        "customer_orders",
+    ]
+
+
+def test_typed_matches_fresh_search():
+    for query in ["cusxomers", "customer_id", "ordr_items", "invoces", "created", "xorders"]:
+        assert typed(index(), query) == index().search(query), query
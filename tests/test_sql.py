@@ -0,0 +1,49 @@
+from util.model import StatementKind
+from util.sql import StatementSplitter, classify, locks_rows, scan
+
+SCRIPTS = [
+    "select 'a; b' as x; select 2;",
+    'select "a;b" from t; /* x; y */ select 2;',
+    "DO $$ declare a int; begin a := 1; end $$; select 1;",
+    "select $tag$ ; $tag$; select 'it''s; ok'; -- c; d\nselect 4;",
+    "create trigger t after insert on x begin insert into y values (1); end; select 3;",
+]
+
+
+def test_typed_split_matches_full_scan():
+    for script in SCRIPTS:
+        splitter = StatementSplitter()
+        for end in range(len(script) + 1):
+            assert splitter.split(script[:end]) == scan(script[:end])[0], script[:end]
+
+
+def test_closing_a_quote_joins_statements():
+    splitter = StatementSplitter()
+    splitter.split("select 'a; b as x; select 2;")
+    text = "select 'a; b' as x; select 2;"
+    assert [text[start:end] for start, end in splitter.split(text)] == [
+        "select 'a; b' as x",
+        "select 2",
+    ]
+
+
+def test_classify():
+    kinds = {
+        "select 1": StatementKind.QUERY,
+        "/* x */ with a as (select 1), b as (select 2) select * from a": StatementKind.QUERY,
+        "with a as (select 1) delete from t where id in (select * from a)": StatementKind.COMMAND,
+        "explain select 1": StatementKind.UTILITY,
+        "explain (analyze, buffers) select 1": StatementKind.COMMAND,
+        "show search_path": StatementKind.UTILITY,
+        "insert into t values (1) returning id": StatementKind.COMMAND,
+        "-- only a comment": StatementKind.UNKNOWN,
+    }
+    for statement, kind in kinds.items():
+        assert classify(statement) == kind, statement
+
+
+def test_locks_rows():
+    assert locks_rows("select * from t for update skip locked")
+    assert locks_rows("select * from t for no key update")
+    assert locks_rows("select * from t\nFOR KEY SHARE")
+    assert not locks_rows("select * from t order by id")
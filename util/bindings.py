@@ -3,8 +3,14 @@ QUIT = ("q", "request_quit", "Quit")
 
 # Active Tab
 EXECUTE_QUERY = ("e", "exec_query", "Execute")
+EXECUTE_STATEMENT = ("E", "exec_statement", "Current")
 CLEAR_INPUT = ("c", "clear_input", "Clear")
 FORMAT_QUERY = ("f", "format_query", "Format")
+CANCEL_QUERY = ("x", "cancel_query", "Cancel")
+FETCH_MORE = ("m", "fetch_more", "More")
+FETCH_ALL = ("M", "fetch_all", "All")
+CLOSE_TAB = ("w", "close_tab", "Close")
+EXPORT_RESULTS = ("o", "export_results", "Export")
 
 # Connection Tree
 PREVIEW_DATA = ("p", "preview_data", "Preview")
@@ -13,6 +19,7 @@ REFRESH_CONNECTION = ("r", "refresh_connection", "Refresh")
 NEW_CONNECTION = ("n", "request_new_connection", "New")
 EDIT_CONNECTION = ("e", "edit_connection", "Edit")
 SAVE_CONNECTIONS = ("S", "save_connections", "Save")
+SEARCH_OBJECTS = ("slash", "search_objects", "Search")
 TREE_LEFT = ("h", "tree_left")
 TREE_DOWN = ("j", "tree_down")
 TREE_UP = ("k", "tree_up")
@@ -21,9 +28,9 @@ TREE_RIGHT = ("l", "tree_right")
 # Containers
 GLOBAL_BINDINGS = [QUIT]
 
-QUERY_BINDINGS = [EXECUTE_QUERY, CLEAR_INPUT, FORMAT_QUERY]
+QUERY_BINDINGS = [EXECUTE_QUERY, EXECUTE_STATEMENT, CLEAR_INPUT, FORMAT_QUERY, CANCEL_QUERY, FETCH_MORE, FETCH_ALL, CLOSE_TAB, EXPORT_RESULTS]
 
-CONNECTION_TREE_BINDINGS = [PREVIEW_DATA, REFRESH_CONNECTION, NEW_CONNECTION, EDIT_CONNECTION, SAVE_CONNECTIONS, TREE_LEFT, TREE_DOWN, TREE_UP, TREE_RIGHT]
+CONNECTION_TREE_BINDINGS = [PREVIEW_DATA, REFRESH_CONNECTION, NEW_CONNECTION, EDIT_CONNECTION, SAVE_CONNECTIONS, SEARCH_OBJECTS, TREE_LEFT, TREE_DOWN, TREE_UP, TREE_RIGHT]
 
 # Collected
 ALL_BINDINGS = GLOBAL_BINDINGS + QUERY_BINDINGS + CONNECTION_TREE_BINDINGS
@@ -0,0 +1,115 @@
+import re
+import threading
+from bisect import bisect_left, insort
+from typing import Iterable
+
+IDENTIFIER = re.compile(r"([\w$]+\.)*[\w$]*$")
+TABLE_REFERENCE = re.compile(
+    r"(?:\bFROM\b|\bJOIN\b|\bUPDATE\b|\bINTO\b|,)\s*([\w$]+(?:\.[\w$]+)?)(?:\s+(?:AS\s+)?([\w$]+))?",
+    re.IGNORECASE,
+)
+NOT_ALIASES = {
+    "as", "cross", "full", "group", "having", "inner", "join", "left", "limit", "natural",
+    "offset", "on", "order", "outer", "right", "set", "union", "using", "values", "where",
+    "window", "from", "select",
+}
+
+
+class IdentifierIndex:
+    """
+    Prefix index over the distinct names of each kind ("schema", "table", "view", "column"),
+    one sorted list per kind. Additions are buffered; large batches are merged by the adding
+    (worker) thread, small ones on the next lookup.
+    """
+
+    MERGE_THRESHOLD = 64
+
+    def __init__(self):
+        self.entries: dict[str, list[tuple[str, str]]] = dict()
+        self.pending: dict[str, list[tuple[str, str]]] = dict()
+        self.seen: set[tuple[str, str]] = set()
+        self.lock = threading.Lock()
+
+    def add(self, kind: str, names: Iterable[str]) -> None:
+        with self.lock:
+            for name in names:
+                if (kind, name) not in self.seen:
+                    self.seen.add((kind, name))
+                    self.pending.setdefault(kind, []).append((name.lower(), name))
+            # merging once the backlog outgrows a fraction of the list keeps bulk loads linear
+            backlog = len(self.pending.get(kind, ()))
+            if backlog > max(self.MERGE_THRESHOLD, len(self.entries.get(kind, ())) // 8):
+                self.merge(kind)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries = dict()
+            self.pending = dict()
+            self.seen = set()
+
+    def lookup(self, prefix: str, kinds: tuple[str, ...], limit: int = 50) -> list[str]:
+        key = prefix.lower()
+        result: list[str] = []
+        with self.lock:
+            for kind in kinds:
+                entries = self.merge(kind)
+                idx = bisect_left(entries, (key,))
+                while idx < len(entries) and len(result) < limit:
+                    if not entries[idx][0].startswith(key):
+                        break
+                    result.append(entries[idx][1])
+                    idx += 1
+        return result
+
+    def merge(self, kind: str) -> list[tuple[str, str]]:
+        entries = self.entries.setdefault(kind, [])
+        pending = self.pending.pop(kind, [])
+        if len(pending) > self.MERGE_THRESHOLD:
+            # two sorted runs, which timsort merges in linear time
+            pending.sort()
+            entries.extend(pending)
+            entries.sort()
+        else:
+            for entry in pending:
+                insort(entries, entry)
+        return entries
+
+    def __len__(self) -> int:
+        return len(self.seen)
+
+
+def context(text: str, row: int, column: int) -> tuple[str | None, str]:
+    """
+    The (qualifier, prefix) being typed at the cursor, e.g. ("o", "cu") for "o.cu".
+    """
+    lines = text.split("\n")
+    line = lines[row][:column] if row < len(lines) else ""
+    word = IDENTIFIER.search(line).group(0)
+    if "." not in word:
+        return (None, word)
+    qualifier, prefix = word.rsplit(".", 1)
+    return (qualifier, prefix)
+
+
+def statement_at(text: str, row: int, column: int) -> str:
+    lines = text.split("\n")
+    offset = sum(len(line) + 1 for line in lines[:row]) + column
+    start = text.rfind(";", 0, offset) + 1
+    end = text.find(";", offset)
+    return text[start : len(text) if end == -1 else end]
+
+
+def references(statement: str) -> dict[str, str]:
+    """
+    Tables referenced by the statement, keyed by their alias and by their own name.
+    """
+    result: dict[str, str] = dict()
+    for match in TABLE_REFERENCE.finditer(statement):
+        name, alias = match.group(1), match.group(2)
+        if name.lower() in NOT_ALIASES:
+            continue
+        result.setdefault(name.lower(), name)
+        result.setdefault(name.rsplit(".", 1)[-1].lower(), name)
+        if alias is not None and alias.lower() not in NOT_ALIASES:
+            result[alias.lower()] = name
+    return result
@@ -1,28 +1,69 @@
 import json
+import os
 import os.path
+import tempfile
 
-from connection.conn import Conn, ConnectionEncoder
+from connection.conn import Conn
 from connection.connection import Connection
 
 FILE_PATH: str = "conn.json"
 
+_written: list[dict] = None
+
+
 def read_conn_file() -> [Connection]:
+    global _written
     if os.path.isfile(FILE_PATH):
         if os.path.getsize(FILE_PATH) == 0:
             return []
-        with open("conn.json", "r") as file:
+        with open(FILE_PATH, "r") as file:
             data = json.load(file)
             connections = list(map(lambda itm: Connection.from_conn(Conn.from_dict(itm)), data))
+            _written = data
             return connections
     else:
         return []
 
 
-def write_conn_file(connections: [Connection]) -> None:
-    conn_arr = []
-    for connection in connections:
-        conn = connection.conn
-        conn.encrypt()
-        conn_arr.append(conn)
-    with open("conn.json", "w") as file:
-        file.write(json.dumps(conn_arr, cls=ConnectionEncoder))
+def write_conn_file(connections: [Connection]) -> int:
+    """
+    Saves the connections, leaving the live Conn objects untouched. Returns the number of
+    entries that changed since the file was last read or written; nothing is written if none did.
+    """
+    global _written
+    entries: list[dict] = list(map(lambda connection: connection.conn.to_dict(), connections))
+    previous: list[dict] = _written or []
+    changed = sum(
+        1 for idx, entry in enumerate(entries) if idx >= len(previous) or previous[idx] != entry
+    )
+    changed += max(len(previous) - len(entries), 0)
+    if changed == 0 and _written is not None:
+        return 0
+    write_atomic(FILE_PATH, json.dumps(entries))
+    _written = entries
+    return changed
+
+
+def write_atomic(path: str, content: str) -> None:
+    """
+    Writes to a temporary file in the same directory, syncs it and renames it over `path`,
+    so a crash leaves either the old or the new file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".conn.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
@@ -1,4 +1,5 @@
 import os.path
+from functools import lru_cache
 
 from cryptography.fernet import Fernet
 from dotenv import load_dotenv
@@ -6,17 +7,24 @@ from dotenv import load_dotenv
 F_KEY: str = "F_KEY"
 
 
+@lru_cache(maxsize=1)
+def _cipher(key: str) -> Fernet:
+    return Fernet(key.encode())
+
+
+def cipher() -> Fernet:
+    return _cipher(os.getenv(F_KEY))
+
+
 def encrypt(input: str) -> str:
     if input is not None and len(input) != 0 and input != "None":
-        cipher = Fernet(os.getenv(F_KEY).encode())
-        return cipher.encrypt(input.encode()).decode()
+        return cipher().encrypt(input.encode()).decode()
     return input
 
 
 def decrypt(input: str) -> str:
     if input is not None and len(input) != 0 and input != "None":
-        cipher = Fernet(os.getenv(F_KEY).encode())
-        return cipher.decrypt(input.encode()).decode()
+        return cipher().decrypt(input.encode()).decode()
     return input
 
 
@@ -0,0 +1,109 @@
+import csv
+import json
+from typing import Any
+
+from connectors.exceptions import ExportError
+from util.model import ExportFormat
+
+BATCH_SIZE: int = 5000
+
+
+class CsvWriter:
+    def __init__(self, path: str, names: tuple):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(names)
+
+    def write(self, rows: list[tuple]) -> None:
+        self.writer.writerows(rows)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class JsonlWriter:
+    def __init__(self, path: str, names: tuple):
+        self.file = open(path, "w", encoding="utf-8")
+        self.names = names
+
+    def write(self, rows: list[tuple]) -> None:
+        self.file.writelines(
+            json.dumps(dict(zip(self.names, row)), default=str, ensure_ascii=False) + "\n"
+            for row in rows
+        )
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class ParquetWriter:
+    """
+    Writes one row group per batch. The schema is inferred from the first batch.
+    """
+
+    def __init__(self, path: str, names: tuple):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ExportError("Parquet export requires pyarrow (pip install pyarrow)")
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.path = path
+        self.names = [str(name) for name in names]
+        self.writer = None
+
+    def write(self, rows: list[tuple]) -> None:
+        columns = list(zip(*rows))
+        if self.writer is None:
+            arrays = [self.infer(values) for values in columns]
+            self.open(
+                [
+                    self.pa.field(name, array.type)
+                    for name, array in zip(self.names, arrays)
+                ]
+            )
+        else:
+            arrays = [
+                self.convert(values, field) for values, field in zip(columns, self.schema)
+            ]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def open(self, fields: list) -> None:
+        self.schema = self.pa.schema(fields)
+        self.writer = self.pq.ParquetWriter(self.path, self.schema)
+
+    def infer(self, values: tuple) -> Any:
+        try:
+            array = self.pa.array(values)
+        except (self.pa.ArrowException, TypeError, ValueError):
+            return self.strings(values)
+        return self.strings(values) if self.pa.types.is_null(array.type) else array
+
+    def convert(self, values: tuple, field: Any) -> Any:
+        if self.pa.types.is_string(field.type):
+            return self.strings(values)
+        try:
+            return self.pa.array(values, type=field.type)
+        except (self.pa.ArrowException, TypeError, ValueError):
+            raise ExportError(f"Column '{field.name}' does not fit its type {field.type}")
+
+    def strings(self, values: tuple) -> Any:
+        return self.pa.array(
+            [None if value is None else str(value) for value in values], type=self.pa.string()
+        )
+
+    def close(self) -> None:
+        if self.writer is None:
+            self.open([self.pa.field(name, self.pa.string()) for name in self.names])
+        self.writer.close()
+
+
+def open_writer(format: ExportFormat, path: str, names: tuple):
+    match format:
+        case ExportFormat.CSV:
+            return CsvWriter(path, names)
+        case ExportFormat.JSONL:
+            return JsonlWriter(path, names)
+        case ExportFormat.PARQUET:
+            return ParquetWriter(path, names)
@@ -0,0 +1,110 @@
+import json
+import logging
+import sqlite3
+import zlib
+
+from util.model import Column, Schema, Table
+
+logger = logging.getLogger(__name__)
+
+FILE_PATH: str = "metadata.db"
+
+DDL = """
+    CREATE TABLE IF NOT EXISTS metadata (
+        uid TEXT NOT NULL,
+        schema TEXT NOT NULL,
+        fingerprint TEXT,
+        payload BLOB NOT NULL,
+        PRIMARY KEY (uid, schema)
+    );
+"""
+
+
+def connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(FILE_PATH)
+    conn.execute(DDL)
+    return conn
+
+
+def load(uid: str) -> (dict[str, Schema], dict[str, str]):
+    schemas: dict[str, Schema] = dict()
+    fingerprints: dict[str, str] = dict()
+    try:
+        with connect() as conn:
+            rows = conn.execute(
+                "SELECT schema, fingerprint, payload FROM metadata WHERE uid = ?", (uid,)
+            ).fetchall()
+        for key, fingerprint, payload in rows:
+            schemas[key] = decode(json.loads(zlib.decompress(payload)))
+            if fingerprint is not None:
+                fingerprints[key] = fingerprint
+    except Exception as e:
+        logger.error(f"Error: {repr(e)}")
+        return (dict(), dict())
+    return (schemas, fingerprints)
+
+
+def save(uid: str, schemas: dict[str, Schema], fingerprints: dict[str, str]) -> None:
+    rows = list(
+        map(
+            lambda itm: (
+                uid,
+                itm[0],
+                fingerprints.get(itm[0]),
+                zlib.compress(json.dumps(encode(itm[1])).encode()),
+            ),
+            list(schemas.items()),
+        )
+    )
+    try:
+        with connect() as conn:
+            conn.execute("DELETE FROM metadata WHERE uid = ?", (uid,))
+            conn.executemany("INSERT INTO metadata VALUES (?, ?, ?, ?)", rows)
+    except Exception as e:
+        logger.error(f"Error: {repr(e)}")
+
+
+def drop(uid: str) -> None:
+    try:
+        with connect() as conn:
+            conn.execute("DELETE FROM metadata WHERE uid = ?", (uid,))
+    except Exception as e:
+        logger.error(f"Error: {repr(e)}")
+
+
+def encode(schema: Schema) -> dict:
+    def objects(items: dict[str, Table] | None) -> dict | None:
+        if items is None:
+            return None
+        return {
+            key: [
+                table.name,
+                None
+                if table.columns is None
+                else [
+                    [c.name, c.type, c.required, c.primary_key, c.default_value]
+                    for c in table.columns
+                ],
+            ]
+            for key, table in items.items()
+        }
+
+    return {
+        "name": schema.name,
+        "tables": objects(schema.tables),
+        "views": objects(schema.views),
+    }
+
+
+def decode(data: dict) -> Schema:
+    def objects(items: dict | None) -> dict[str, Table] | None:
+        if items is None:
+            return None
+        return {
+            key: Table(
+                name, None if columns is None else [Column(*c) for c in columns]
+            )
+            for key, (name, columns) in items.items()
+        }
+
+    return Schema(data["name"], objects(data["tables"]), objects(data["views"]))
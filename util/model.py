@@ -21,11 +21,24 @@ class ConnectorType(ExtendedEnum):
     DUMMY = "Dummy"
 
 
+class ExportFormat(ExtendedEnum):
+    CSV = "csv"
+    JSONL = "jsonl"
+    PARQUET = "parquet"
+
+
 class ExecutionStatus(Enum):
     Success = 1
     Failure = 2
 
 
+class StatementKind(Enum):
+    QUERY = "query"  # read-only, returns rows, safe to re-run while paging
+    UTILITY = "utility"  # read-only, returns rows, but cannot back a server-side cursor
+    COMMAND = "command"  # runs once, may still return rows (RETURNING, PRAGMA)
+    UNKNOWN = "unknown"
+
+
 @dataclass
 class Column:
     name: str
@@ -70,3 +83,30 @@ class Schema:
 
     def get_name(self) -> str:
         return self.name
+
+
+class NodeKind(Enum):
+    CONNECTION = "connection"
+    SCHEMA = "schema"
+    TABLES = "tables"
+    VIEWS = "views"
+    SEQUENCES = "sequences"
+    TABLE = "table"
+    VIEW = "view"
+    COLUMN = "column"
+    DETAIL = "detail"
+    LOADING = "loading"
+
+
+@dataclass(frozen=True)
+class NodeData:
+    """
+    Payload of a connection tree node. `type` is "table" or "view" below a Tables/Views node.
+    """
+
+    kind: NodeKind
+    uid: str
+    schema: str = None
+    type: str = None
+    object: str = None
+    column: str = None
@@ -0,0 +1,26 @@
+import time
+
+
+class StartupProfiler:
+    """
+    Wall-clock breakdown of startup, each phase measured from the end of the previous one
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.started = time.perf_counter()
+        self.last = self.started
+        self.phases: list[(str, float)] = []
+
+    def mark(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def report(self) -> str:
+        lines = [f"{phase:<16}{elapsed * 1000:>10.1f} ms" for phase, elapsed in self.phases]
+        lines.append(f"{'total':<16}{(self.last - self.started) * 1000:>10.1f} ms")
+        return "\n".join(lines)
+
+
+PROFILER = StartupProfiler()
@@ -0,0 +1,157 @@
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from heapq import nlargest
+from typing import Iterable
+
+# (schema, type, object, column) of a tree node, with the trailing parts None
+Path = tuple[str, str | None, str | None, str | None]
+
+
+def trigrams(text: str, complete: bool = True) -> set[str]:
+    """
+    Trigrams of `text` padded at the start, so short and leading fragments weigh more.
+    A query still being typed is not padded at the end.
+    """
+    padded = f"  {text.lower()}{' ' if complete else ''}"
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def tally(counts: Counter, lists: list[array]) -> None:
+    """
+    Adds to the count of every id in `counts` the sorted `lists` it appears in.
+    """
+    for ids in lists:
+        if len(counts) * 4 > len(ids):
+            members = set(ids)
+            for idx in counts:
+                if idx in members:
+                    counts[idx] += 1
+        else:
+            for idx in counts:
+                pos = bisect_left(ids, idx)
+                if pos < len(ids) and ids[pos] == idx:
+                    counts[idx] += 1
+
+
+class ObjectIndex:
+    """
+    Trigram index over the names of schemas, tables, views and columns, for fuzzy search.
+    """
+
+    MIN_QUERY = 2
+    EMPTY = array("I")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        with self.lock:
+            self.reset()
+
+    def reset(self) -> None:
+        self.paths: list[Path | None] = []
+        self.names: list[str] = []
+        self.bias: list[float] = []
+        self.ids: dict[Path, int] = dict()
+        self.by_schema: dict[str, list[int]] = dict()
+        self.postings: dict[str, array] = dict()
+        self.last: tuple[str, set[str], Counter, int] = ("", set(), Counter(), 0)
+
+    def add(self, paths: Iterable[Path]) -> None:
+        with self.lock:
+            for path in paths:
+                if path in self.ids:
+                    continue
+                idx = len(self.paths)
+                self.ids[path] = idx
+                self.paths.append(path)
+                name = next(part for part in reversed(path) if part is not None)
+                self.names.append(name.lower())
+                # shorter names first, and objects before their columns
+                self.bias.append(-len(name) / 1000 - (0.1 if path[3] is not None else 0))
+                self.by_schema.setdefault(path[0].lower(), []).append(idx)
+                for gram in trigrams(name):
+                    self.postings.setdefault(gram, array("I")).append(idx)
+            self.last = ("", set(), Counter(), 0)
+
+    def discard(self, schema: str, type: str = None, object: str = None) -> None:
+        """
+        Drops `schema`, or one of its tables/views folders, or one object, with everything below.
+        """
+        prefix = tuple(part.lower() for part in (schema, type, object) if part is not None)
+        with self.lock:
+            kept: list[int] = []
+            for idx in self.by_schema.pop(schema.lower(), []):
+                path = self.paths[idx]
+                if tuple((part or "").lower() for part in path[: len(prefix)]) == prefix:
+                    del self.ids[path]
+                    self.paths[idx] = None
+                else:
+                    kept.append(idx)
+            if kept:
+                self.by_schema[schema.lower()] = kept
+            self.last = ("", set(), Counter(), 0)
+
+    def search(self, query: str, limit: int = 50) -> list[tuple[float, Path]]:
+        """
+        Best `limit` matches for `query` as (score, path). Longer queries tolerate typos: up to
+        half of their trigrams may be missing from a match.
+        """
+        query = query.strip().lower()
+        if len(query) < self.MIN_QUERY:
+            return []
+        grams = trigrams(query, complete=False)
+        need = len(grams) if len(grams) <= 3 else len(grams) - (len(grams) - 1) // 2
+        with self.lock:
+            last_query, last_grams, last_counts, bound = self.last
+            if last_query and query.startswith(last_query):
+                # typing on: the previous candidates only need the new trigrams counted,
+                # and ids left out can only get in through the new trigrams' shortest lists
+                counts = Counter(last_counts)
+                lists: list[array] = sorted(
+                    (self.postings.get(gram, self.EMPTY) for gram in grams - last_grams), key=len
+                )
+                seeds = max(len(lists) - (need - bound) + 1, 0)
+                added: Counter = Counter()
+                for ids in lists[:seeds]:
+                    added.update(idx for idx in ids if idx not in counts)
+                tally(counts, lists)
+                tally(added, lists[seeds:])
+                tally(added, [self.postings.get(gram, self.EMPTY) for gram in last_grams])
+                counts.update(added)
+                bound = min(bound + len(lists), need - 1)
+            else:
+                lists: list[array] = sorted(
+                    (self.postings.get(gram, self.EMPTY) for gram in grams), key=len
+                )
+                # only ids in one of the k - need + 1 shortest lists can reach `need`
+                counts = Counter()
+                for ids in lists[: len(lists) - need + 1]:
+                    counts.update(ids)
+                tally(counts, lists[len(lists) - need + 1 :])
+                bound = need - 1
+            # all candidates with their counts, as the next keystroke needs them; ids left
+            # out have at most `bound` of the trigrams
+            self.last = (query, grams, counts, bound)
+            matches = {
+                idx: count
+                for idx, count in counts.items()
+                if count >= need and self.paths[idx] is not None
+            }
+            names, bias, total = self.names, self.bias, len(grams)
+            scored = [
+                (
+                    count / total
+                    + bias[idx]
+                    + (1 if names[idx].startswith(query) else 0.5 if query in names[idx] else 0),
+                    idx,
+                )
+                for idx, count in matches.items()
+            ]
+            return [(score, self.paths[idx]) for score, idx in nlargest(limit, scored)]
+
+    def __len__(self) -> int:
+        return len(self.ids)
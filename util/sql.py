@@ -0,0 +1,216 @@
+import re
+from bisect import bisect_right
+
+from util.model import StatementKind
+
+LEADING = r"(?:\s|--[^\n]*|/\*.*?\*/)*"
+TOKENS = re.compile(
+    r"'(?:[^']|'')*'"
+    r'|"(?:[^"]|"")*"'
+    r"|--[^\n]*"
+    r"|/\*.*?\*/"
+    r"|\$(?P<tag>(?:[A-Za-z_]\w*)?)\$.*?\$(?P=tag)\$"
+    r"|\b(?P<word>BEGIN|CASE|END)\b"
+    r"|;"
+    # opening a quote, comment or dollar-quoted string that is never closed
+    r"|(?P<open>'|\"|/\*|\$(?:[A-Za-z_]\w*)?\$)",
+    re.DOTALL | re.IGNORECASE,
+)
+# statements whose BEGIN ... END body holds semicolons of its own
+BODY = re.compile(
+    LEADING + r"CREATE\b[^;]*?\b(?:TRIGGER|FUNCTION|PROCEDURE)\b", re.DOTALL | re.IGNORECASE
+)
+# tokens past WITH or EXPLAIN, up to the statement they lead to
+CLAUSE_TOKENS = re.compile(
+    r"'(?:[^']|'')*'"
+    r'|"(?:[^"]|"")*"'
+    r"|--[^\n]*"
+    r"|/\*.*?\*/"
+    r"|\$(?P<tag>(?:[A-Za-z_]\w*)?)\$.*?\$(?P=tag)\$"
+    r"|[()]"
+    r"|\w+",
+    re.DOTALL,
+)
+# the only statements PostgreSQL accepts in DECLARE ... CURSOR FOR
+QUERIES = {"SELECT", "VALUES", "TABLE"}
+UTILITIES = {"SHOW", "DESCRIBE", "DESC"}
+COMMANDS = {
+    "INSERT", "UPDATE", "DELETE", "MERGE", "UPSERT", "REPLACE", "COPY", "CREATE", "DROP",
+    "ALTER", "TRUNCATE", "RENAME", "COMMENT", "GRANT", "REVOKE", "CALL", "DO", "EXECUTE",
+    "SET", "RESET", "PRAGMA", "VACUUM", "ANALYZE", "ANALYSE", "REINDEX", "CLUSTER",
+    "REFRESH", "LOCK", "ATTACH", "DETACH", "BEGIN", "START", "COMMIT", "END", "ROLLBACK",
+    "ABORT", "SAVEPOINT", "RELEASE", "PREPARE", "DEALLOCATE", "DECLARE", "FETCH", "MOVE",
+    "CLOSE", "LISTEN", "NOTIFY", "UNLISTEN", "DISCARD", "CHECKPOINT", "LOAD", "SECURITY",
+    "IMPORT",
+}
+TRANSACTION_CONTROL = {"BEGIN", "START", "COMMIT", "END", "ROLLBACK", "ABORT"}
+# row locking clauses, which PostgreSQL does not allow in a SCROLL cursor
+LOCKING = re.compile(r"\bFOR\s+(?:NO\s+KEY\s+|KEY\s+)?(?:UPDATE|SHARE)\b", re.IGNORECASE)
+SKIP = re.compile(r"\s+|--[^\n]*|/\*.*?\*/", re.DOTALL)
+WORD = re.compile(r"\w+")
+
+
+def split(text: str) -> list[tuple[int, int]]:
+    """
+    (start, end) offsets of the statements in `text`. Semicolons inside quotes, comments,
+    dollar-quoted strings and trigger or routine bodies do not end a statement.
+    Statements holding nothing but comments are left out.
+    """
+    body: str = text.rstrip()
+    if ";" not in body[:-1]:
+        # a single statement, such as a generated INSERT batch, needs no tokenizing
+        spans: list[tuple[int, int]] = []
+        add_span(text, spans, 0, len(body) - 1 if body.endswith(";") else len(body))
+        return spans
+    return scan(text)[0]
+
+
+def scan(text: str, start: int = 0) -> tuple[list[tuple[int, int]], list[int], int | None]:
+    """
+    Statement spans of `text` from `start` on, the offsets right after each separator,
+    where scanning can resume, and the start of the first quote, comment or dollar-quoted
+    string left open. Separators past that start only hold until it gets closed.
+    """
+    spans: list[tuple[int, int]] = []
+    cuts: list[int] = []
+    opened: int | None = None
+    depth = 0
+    for match in TOKENS.finditer(text, start):
+        word = match.group("word")
+        if match.group("open") is not None:
+            if opened is None:
+                opened = match.start()
+        elif word is not None:
+            match word.upper():
+                case "BEGIN" | "CASE":
+                    if depth > 0 or BODY.match(text, start, match.start()):
+                        depth += 1
+                case "END":
+                    depth = max(depth - 1, 0)
+        elif match.group(0) == ";" and depth == 0:
+            add_span(text, spans, start, match.start())
+            start = match.end()
+            cuts.append(start)
+    add_span(text, spans, start, len(text))
+    return (spans, cuts, opened)
+
+
+def add_span(text: str, spans: list[tuple[int, int]], start: int, end: int) -> None:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    if keyword(text[start:end]) is not None:
+        spans.append((start, end))
+
+
+def statements(text: str) -> list[str]:
+    return [text[start:end] for start, end in split(text)]
+
+
+def keyword(statement: str) -> str | None:
+    """
+    First keyword of `statement` past any leading comments, upper-cased.
+    """
+    match = first_word(statement)
+    return None if match is None else match.group(0).upper()
+
+
+def first_word(statement: str) -> re.Match | None:
+    pos = 0
+    while (skipped := SKIP.match(statement, pos)) is not None:
+        pos = skipped.end()
+    return WORD.match(statement, pos)
+
+
+def locks_rows(statement: str) -> bool:
+    return LOCKING.search(statement) is not None
+
+
+def common_prefix(old: str, new: str) -> int:
+    """
+    Length of the common prefix, found by halving so only C-level comparisons run.
+    """
+    low, high = 0, min(len(old), len(new))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if old[low:mid] == new[low:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+class StatementSplitter:
+    """
+    Splits successive versions of one buffer, re-scanning only from the last separator
+    before the first changed character, or before the quote or comment left open.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.spans: list[tuple[int, int]] = []
+        self.cuts: list[int] = []
+        self.opened: int | None = None
+
+    def split(self, text: str) -> list[tuple[int, int]]:
+        if text == self.text:
+            return self.spans
+        unchanged = common_prefix(self.text, text)
+        if self.opened is not None:
+            # closing what was left open can swallow the separators found after it
+            unchanged = min(unchanged, self.opened)
+        kept = bisect_right(self.cuts, unchanged)
+        restart = self.cuts[kept - 1] if kept > 0 else 0
+        spans, cuts, self.opened = scan(text, restart)
+        self.spans = [span for span in self.spans if span[1] < restart] + spans
+        self.cuts = self.cuts[:kept] + cuts
+        self.text = text
+        return self.spans
+
+    def statement_at(self, text: str, offset: int) -> tuple[int, int] | None:
+        """
+        Span of the statement holding `offset`, or of the one before it when `offset`
+        sits between statements.
+        """
+        spans = self.split(text)
+        if len(spans) == 0:
+            return None
+        return spans[max(bisect_right(spans, (offset, len(text))) - 1, 0)]
+
+
+def classify(statement: str) -> StatementKind:
+    """
+    Whether `statement` is a query that can back a server-side cursor, a read-only utility
+    such as EXPLAIN or SHOW, or a command, from its leading keywords. Comments are skipped,
+    and so are the common table expressions of WITH and the options of EXPLAIN, so only
+    the start of a large statement is ever looked at.
+    """
+    word: re.Match | None = first_word(statement)
+    first: str | None = None if word is None else word.group(0).upper()
+    if first in QUERIES:
+        return StatementKind.QUERY
+    if first in UTILITIES:
+        return StatementKind.UTILITY
+    if first in COMMANDS:
+        return StatementKind.COMMAND
+    if first not in ["WITH", "EXPLAIN"]:
+        return StatementKind.UNKNOWN
+    depth = 0
+    analyze = False
+    for match in CLAUSE_TOKENS.finditer(statement, word.end()):
+        token: str = match.group(0)
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif token.upper() in ["ANALYZE", "ANALYSE"] and first == "EXPLAIN":
+            analyze = True
+        elif depth == 0 and (token.upper() in QUERIES or token.upper() in COMMANDS):
+            # EXPLAIN ANALYZE runs the statement, WITH takes the kind of its main statement
+            if analyze:
+                return StatementKind.COMMAND
+            if first == "EXPLAIN":
+                return StatementKind.UTILITY
+            return classify(statement[match.start() :])
+    return StatementKind.UNKNOWN
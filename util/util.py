@@ -10,3 +10,15 @@ def get_env_color(env: Env) -> str:
             return "dark_orange"
         case Env.PROD:
             return "red"
+
+
+def get_fetch_limit(env: Env) -> int:
+    match env:
+        case Env.DEV:
+            return 1000
+        case Env.SIT:
+            return 1000
+        case Env.SAT:
+            return 500
+        case Env.PROD:
+            return 200